@@ -0,0 +1,447 @@
+import time
+import asyncio
+import functools
+import itertools
+import threading
+import aiohttp
+import bot
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from web3 import AsyncWeb3, AsyncHTTPProvider
+from telegram import Update
+from telegram.ext import Application, AIORateLimiter, CommandHandler, MessageHandler, CallbackQueryHandler, ChatMemberHandler, ContextTypes, filters
+
+#
+## Asyncio runtime for the deSypher bot, on python-telegram-bot 20+'s Application.
+## Moderation, the market commands and the buybot await Telegram, market data and RPC calls on one event loop,
+## so hundreds of updates can be in flight without a worker thread each.
+## Every other handler is bot.py's own, run on a worker thread with its Telegram calls made on the event loop.
+## The logic lives in bot.py, this file only awaits its I/O.
+#
+## Usage: pip install -r requirements-async.txt && python async_bot.py
+#
+
+config = bot.config
+async_config = config.get('asyncRuntime', {})
+
+#region Classes
+class AsyncHttpClient:
+    """bot.http's retries, circuit breakers and counters over one pooled aiohttp session."""
+    def __init__(self, http):
+        self.http = http
+        self._client = None
+        print(f"Initialized AsyncHttpClient with pool_size={http.pool_size}")
+
+    async def start(self):
+        connect_timeout, read_timeout = self.http.timeout
+        self._client = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=self.http.pool_size),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+
+    async def get_json(self, url, **kwargs):
+        host = urlparse(url).netloc
+        upstream = self.http._upstream(host)
+
+        for attempt in itertools.count():
+            self.http._admit(host, upstream)
+            start = time.monotonic()
+            try:
+                async with self._client.get(url, **kwargs) as response:
+                    delay = self.http._responded(host, upstream, attempt, start, response.status, response.headers)
+                    if delay is None:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = self.http._failed(host, upstream, attempt, start, e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+class AsyncMarketData:
+    """bot.market_data's entries and freshness rules, with its fetches awaited on the event loop, one per key."""
+    def __init__(self, cache):
+        self.cache = cache
+        self._flights = {}  # key -> task fetching it
+        print(f"Initialized AsyncMarketData with ttl={cache.ttl}, stale_ttl={cache.stale_ttl}")
+
+    async def get(self, key, fetch, ttl=None):
+        value, refresh = self.cache._lookup(key, ttl)
+        if not refresh:
+            return value
+        flight = self._flight(key, fetch)
+        if value is not None:
+            return value
+
+        value = await flight
+        if value is None:
+            self.cache._report_expired(key)
+        return value
+
+    def _flight(self, key, fetch):
+        task = self._flights.get(key)
+        if task is None:
+            task = self._flights[key] = asyncio.ensure_future(self._fetch(key, fetch))
+        # Shielded so a caller giving up does not cancel the fetch for everyone else waiting on it
+        return asyncio.shield(task)
+
+    async def _fetch(self, key, fetch):
+        try:
+            value = await fetch()
+        except Exception as e:
+            print(f"Failed to fetch market data for {key}: {e}")
+            value = None
+        finally:
+            self._flights.pop(key, None)
+        self.cache.put(key, value)
+        return value
+
+class AsyncPriceOracle(bot.PriceOracle):
+    """PriceOracle's Multicall3 reads over an AsyncWeb3 provider."""
+    def __init__(self, w3, *args):
+        super().__init__(*args)
+        self.w3 = w3
+
+    def _contract(self, address, abi):
+        return self.w3.eth.contract(address=self.w3.to_checksum_address(address), abi=abi)
+
+    async def _multicall(self, calls):
+        multicall = self._contract(self.multicall_address, self.MULTICALL_ABI)
+        requests_data = [(self.w3.to_checksum_address(address), False, self._encode(self._contract(address, abi), fn_name)) for address, abi, fn_name, _ in calls]
+        results = await multicall.functions.aggregate3(requests_data).call()
+        return [self.w3.codec.decode(types, bytes(return_data)) for (_, _, _, types), (_, return_data) in zip(calls, results)]
+
+    async def quote(self):
+        if self._pools is None:
+            tokens = [token[0] for token in await self._multicall(self._token_calls())]
+            self._store_pools(tokens, await self._multicall(self._decimals_calls(tokens)))
+        return self._quote_from_slots(await self._multicall(self._slot0_calls()))
+
+class AsyncLogScanner(bot.LogScanner):
+    """LogScanner's ranges, dedup and checkpoint, reading the chain through an AsyncWeb3 provider."""
+    async def _get_logs(self, from_block, to_block):
+        return await self.w3.eth.get_logs(self._log_filter(from_block, to_block))
+
+    async def scan(self):
+        head = await self.w3.eth.block_number
+        from_block = self._first_block(head)
+        if from_block is None:
+            return []
+        events = []
+        seen = {}
+
+        while from_block <= head:
+            to_block = min(from_block + self.chunk - 1, head)
+            try:
+                logs = await self._get_logs(from_block, to_block)
+            except Exception as e:
+                if not self._shrink(from_block, to_block, e):
+                    raise
+                continue
+            self._take(logs, seen, events)
+            from_block = to_block + 1
+
+        self._finish(head, seen)
+        return events
+
+class ThreadedJob:
+    """An Application Job as bot.py's job callbacks read it, with its data under 13.x's name."""
+    def __init__(self, job):
+        self._job = job
+        self.context = job.data
+
+    def __getattr__(self, name):
+        return getattr(self._job, name)
+
+class ThreadedJobQueue:
+    """The Application's JobQueue with bot.py's run_once signature, running the callbacks on worker threads."""
+    def __init__(self, job_queue):
+        self._job_queue = job_queue
+
+    def run_once(self, callback, when, context=None, name=None):
+        return self._job_queue.run_once(threaded(callback), when, data=context, name=name)
+
+    def get_jobs_by_name(self, name):
+        return self._job_queue.get_jobs_by_name(name)
+
+class ThreadedContext:
+    """The CallbackContext bot.py's handlers expect, over an Application's context."""
+    def __init__(self, context):
+        self.bot = context.bot  # Only called through bot.dispatch, which makes the call on the event loop
+        self.args = context.args
+        self.chat_data = context.chat_data
+        self.job_queue = ThreadedJobQueue(context.job_queue)
+        self.job = ThreadedJob(context.job) if context.job is not None else None
+#endregion Classes
+
+http = AsyncHttpClient(bot.http)
+market_data = AsyncMarketData(bot.market_data)
+
+w3 = AsyncWeb3(AsyncHTTPProvider(bot.BASE_ENDPOINT))
+price_oracle = AsyncPriceOracle(w3, bot.contract_address, bot.pool_address, config['wethUsdPoolAddress'], config['multicallAddress'])
+rpc_ready = False
+
+background_tasks = set()
+
+def threaded(callback):
+    """Run one of bot.py's handlers or job callbacks on a worker thread."""
+    @functools.wraps(callback)
+    async def run(*args):
+        *update, context = args
+        await asyncio.to_thread(callback, *update, ThreadedContext(context))
+    return run
+
+#region Ethereum Logic
+async def connect_rpc():
+    # Retry in the background, DexScreener prices until the RPC is up
+    global rpc_ready
+    while not rpc_ready:
+        try:
+            rpc_ready = await w3.is_connected()
+        except Exception as e:
+            print(f"Failed to connect to the RPC: {e}")
+        if not rpc_ready:
+            await asyncio.sleep(30)
+    print(f"Connected to Ethereum node on network {await w3.net.version}")
+
+async def get_onchain_quote():
+    if not rpc_ready:
+        return None
+    return await market_data.get('onchain_quote', price_oracle.quote, ttl=bot.ORACLE_TTL)
+
+async def get_token_price_in_weth(contract_address):
+    return await market_data.get(('token_price_in_weth', contract_address), lambda: fetch_token_price_in_weth(contract_address))
+
+async def get_weth_price_in_fiat(currency):
+    return await market_data.get(('weth_price_in_fiat', currency), lambda: fetch_weth_price_in_fiat(currency))
+
+async def fetch_token_price_in_weth(contract_address):
+    try:
+        data = await http.get_json(f"https://api.dexscreener.com/latest/dex/tokens/{contract_address}")
+        return bot.parse_token_price_in_weth(data)
+    except (aiohttp.ClientError, asyncio.TimeoutError, bot.CircuitOpenError) as e:
+        print(f"Error fetching token price from DexScreener: {e}")
+        return None
+
+async def fetch_weth_price_in_fiat(currency):
+    try:
+        data = await http.get_json(f"https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies={currency}")
+        return data['ethereum'][currency]
+    except (aiohttp.ClientError, asyncio.TimeoutError, bot.CircuitOpenError, KeyError) as e:
+        print(f"Error fetching WETH price from CoinGecko: {e}")
+        return None
+
+async def get_token_price_in_fiat(contract_address, currency):
+    # bot.get_token_price_in_fiat's lookups, awaited in the same order
+    quote = await get_onchain_quote() if contract_address.lower() == bot.contract_address.lower() else None
+    if quote is not None and currency == 'usd':
+        return quote['token_in_usd']
+
+    token_price_in_weth = quote['token_in_weth'] if quote is not None else await get_token_price_in_weth(contract_address)
+    weth_price_in_fiat = await get_weth_price_in_fiat(currency) if token_price_in_weth is not None else None
+    return bot.combine_token_price(token_price_in_weth, weth_price_in_fiat, currency)
+
+async def fetch_pool_snapshot():
+    try:
+        return bot.parse_pool_snapshot(await http.get_json(f"https://api.geckoterminal.com/api/v2/networks/base/pools/{bot.pool_address}"))
+    except (aiohttp.ClientError, asyncio.TimeoutError, bot.CircuitOpenError, KeyError, ValueError) as e:
+        print(f"Failed to fetch pool data: {str(e)}")
+        return None
+
+async def get_pool_snapshot():
+    return await market_data.get('pool_snapshot', fetch_pool_snapshot)
+
+async def monitor_transfers():
+    # The Firestore checkpoint is read and written on worker threads, the logs are awaited
+    while True:
+        try:
+            if not rpc_ready:
+                raise ConnectionError("RPC endpoint unreachable")
+            log_scanner = await asyncio.to_thread(
+                AsyncLogScanner,
+                checkpoint_ref=bot.firebase.get().collection('buybot').document('checkpoint'),
+                confirmations=config.get('scannerConfirmations', 5),
+                max_catchup=config.get('scannerMaxCatchupBlocks', 43200),
+                w3=w3
+            )
+            break
+        except Exception as e:
+            print(f"Buy monitor waiting on its subsystems: {e}")
+            await asyncio.sleep(30)
+
+    while True:
+        try:
+            await handle_transfer_events(await log_scanner.scan())
+            await asyncio.to_thread(log_scanner.commit, bot.pending_buy_block())
+        except Exception as e:
+            print(f"Error scanning transfer logs: {e}")
+        await asyncio.sleep(10)
+
+async def handle_transfer_events(events):
+    batch = bot.claim_buys(events)
+    if batch:
+        sypher_price_in_usd = await market_data.get(bot.BUY_PRICE_KEY, lambda: get_token_price_in_fiat(bot.contract_address, 'usd'))
+        # The digest waits on its first send, so posting stays off the event loop
+        await asyncio.to_thread(bot.post_buys, batch, sypher_price_in_usd)
+#endregion Ethereum Logic
+
+#region Admin Controls
+async def is_user_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    if update.effective_chat.type == 'private':
+        return False
+
+    chat_id = update.effective_chat.id
+    admins = bot.admin_cache.peek(chat_id)
+    if admins is None:
+        admins = bot.admin_cache.put(chat_id, await context.bot.get_chat_administrators(chat_id))
+    return update.effective_user.id in admins
+
+async def handle_chat_member_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    bot.handle_chat_member_update(update, context)
+
+async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if update.message is None or update.message.text is None:
+        return
+    if await is_user_admin(update, context):
+        return
+
+    verdict = bot.moderate_message(update.message.text, update.message.from_user.id)
+    if verdict:
+        await asyncio.to_thread(bot.apply_verdict, update, ThreadedContext(context), verdict)
+#endregion Admin Controls
+
+#region Slash Commands
+async def reply(update, text, **kwargs):
+    msg = await update.message.reply_text(text, **kwargs)
+    bot.track_message(msg)
+    return msg
+
+async def price(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not bot.rate_limit_check(update):
+        return
+    currency = bot.parse_price_currency(context.args)
+    if currency is None:
+        await reply(update, bot.UNSUPPORTED_CURRENCY_MESSAGE)
+        return
+    await reply(update, bot.format_price_message(currency, await get_token_price_in_fiat(bot.contract_address, currency)))
+
+async def liquidity(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not bot.rate_limit_check(update):
+        return
+    snapshot = await get_pool_snapshot()
+    await reply(update, bot.format_liquidity_message(snapshot['reserve_usd'] if snapshot else None))
+
+async def volume(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not bot.rate_limit_check(update):
+        return
+    snapshot = await get_pool_snapshot()
+    await reply(update, bot.format_volume_message(snapshot['volume_usd'].get('h24') if snapshot else None))
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not bot.rate_limit_check(update):
+        return
+    await reply(update, bot.format_stats_message(await get_pool_snapshot()))
+
+async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not await is_user_admin(update, context):
+        await reply(update, "You must be an admin to use this command.")
+        return
+
+    subsystems = f"{bot.subsystem_report(bot.firebase)}, rpc {'ready' if rpc_ready else 'initializing'}"
+    await reply(update, bot.format_status_message(subsystems, f"In flight: {len(asyncio.all_tasks())} tasks, {bot.outbound.pending()} queued sends"))
+#endregion Slash Commands
+
+def run_in_background(coroutine):
+    task = asyncio.get_running_loop().create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def on_startup(application: Application) -> None:
+    loop = asyncio.get_running_loop()
+    # bot.py's handlers, their jobs and the blocking Firestore calls share these threads
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=async_config.get('handlerThreads', 32), thread_name_prefix='handler'))
+    await http.start()
+    bot.outbound.start(application.bot, loop)
+    bot.firebase.start()
+    threading.Thread(target=bot.watch_filters, daemon=True).start()
+    run_in_background(connect_rpc())
+    run_in_background(monitor_transfers())
+    bot.chart_renderer.start()
+
+async def on_shutdown(application: Application) -> None:
+    for task in background_tasks:
+        task.cancel()
+    await http.close()
+
+def main() -> None:
+    application = (
+        Application.builder()
+        .token(bot.TELEGRAM_TOKEN)
+        .concurrent_updates(async_config.get('concurrentUpdates', 256))
+        .rate_limiter(AIORateLimiter())
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
+
+    #region General Slash Command Handlers
+    application.add_handler(CommandHandler("start", threaded(bot.start)))
+    application.add_handler(CommandHandler("help", threaded(bot.help)))
+    application.add_handler(CommandHandler("play", threaded(bot.play)))
+    application.add_handler(CommandHandler("endgame", threaded(bot.end_game)))
+    application.add_handler(CommandHandler("tukyo", threaded(bot.tukyo)))
+    application.add_handler(CommandHandler("tukyogames", threaded(bot.tukyogames)))
+    application.add_handler(CommandHandler("desypher", threaded(bot.deSypher)))
+    application.add_handler(CommandHandler(["sypher", "tokenomics"], threaded(bot.sypher)))
+    application.add_handler(CommandHandler("whitepaper", threaded(bot.whitepaper)))
+    application.add_handler(CommandHandler(["contract", "ca"], threaded(bot.ca)))
+    application.add_handler(CommandHandler("chart", threaded(bot.chart)))
+    application.add_handler(CommandHandler("price", price))
+    application.add_handler(CommandHandler(["liquidity", "lp"], liquidity))
+    application.add_handler(CommandHandler("volume", volume))
+    application.add_handler(CommandHandler("stats", stats))
+    application.add_handler(CommandHandler("website", threaded(bot.website)))
+    application.add_handler(CommandHandler("report", threaded(bot.report)))
+    application.add_handler(CommandHandler("save", threaded(bot.save)))
+    #endregion General Slash Command Handlers
+
+    #region Admin Slash Command Handlers
+    application.add_handler(CommandHandler("adminhelp", threaded(bot.admin_help)))
+    application.add_handler(CommandHandler("cleanbot", threaded(bot.cleanbot)))
+    application.add_handler(CommandHandler("cleargames", threaded(bot.cleargames)))
+    application.add_handler(CommandHandler("status", status))
+    application.add_handler(CommandHandler("antiraid", threaded(bot.antiraid)))
+    application.add_handler(CommandHandler("mute", threaded(bot.mute)))
+    application.add_handler(CommandHandler("unmute", threaded(bot.unmute)))
+    application.add_handler(CommandHandler("kick", threaded(bot.kick)))
+    application.add_handler(CommandHandler("filter", threaded(bot.filter)))
+    application.add_handler(CommandHandler("removefilter", threaded(bot.remove_filter)))
+    application.add_handler(CommandHandler("filterlist", threaded(bot.filter_list)))
+    application.add_handler(CommandHandler("warn", threaded(bot.warn)))
+    #endregion Admin Slash Command Handlers
+
+    application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, threaded(bot.handle_new_user)))
+    application.add_handler(MessageHandler(filters.StatusUpdate.LEFT_CHAT_MEMBER, threaded(bot.delete_service_messages)))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+
+    # Game guesses see the same messages from their own group, as in bot.py
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, threaded(bot.handle_guess)), group=1)
+
+    application.add_handler(CallbackQueryHandler(threaded(bot.verification_callback), pattern=r'^verify_\d+$'))
+    application.add_handler(CallbackQueryHandler(threaded(bot.handle_start_verification), pattern='start_verification'))
+    application.add_handler(CallbackQueryHandler(threaded(bot.handle_verification_button), pattern=r'verify_letter_[A-Z]'))
+    application.add_handler(CallbackQueryHandler(threaded(bot.handle_start_game), pattern='^startGame$'))
+    application.add_handler(CallbackQueryHandler(threaded(bot.help_buttons), pattern='^help_'))
+    application.add_handler(ChatMemberHandler(handle_chat_member_update, ChatMemberHandler.ANY_CHAT_MEMBER))
+
+    application.job_queue.run_repeating(threaded(bot.sync_candle_store), interval=60, first=1)
+    application.job_queue.run_repeating(threaded(bot.prune_trackers), interval=300, first=300)
+
+    application.run_polling(allowed_updates=Update.ALL_TYPES)
+
+if __name__ == '__main__':
+    main()
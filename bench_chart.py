@@ -0,0 +1,65 @@
+import time
+import random
+import pandas as pd
+import charting
+
+#
+## Micro-benchmark for chart ingestion and indicator overlays.
+## Usage: python bench_chart.py [candles] [repeats]
+#
+
+def legacy_prepare(ohlcv_list):
+    # The row-by-row path prepare_data_for_chart used before vectorized ingestion
+    data = [{
+        'Date': pd.to_datetime(item[0], unit='s'),
+        'Open': item[1],
+        'High': item[2],
+        'Low': item[3],
+        'Close': item[4],
+        'Volume': item[5]
+    } for item in ohlcv_list]
+
+    data_frame = pd.DataFrame(data)
+    data_frame.sort_values('Date', inplace=True)
+    data_frame.set_index('Date', inplace=True)
+    return data_frame
+
+def make_ohlcv_list(candles):
+    now = int(time.time()) // 60 * 60
+    price = 1.0
+    ohlcv_list = []
+    for i in range(candles):
+        open_price = price
+        price = max(0.01, price * (1 + random.uniform(-0.01, 0.01)))
+        ohlcv_list.append([now - 60 * i, open_price, max(open_price, price) * 1.002, min(open_price, price) * 0.998, price, random.uniform(0, 1000)])
+    return ohlcv_list
+
+def best_of(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(candles=500, repeats=20):
+    ohlcv_list = make_ohlcv_list(candles)
+
+    legacy = best_of(lambda: legacy_prepare(ohlcv_list), repeats)
+    vectorized = best_of(lambda: charting.ohlcv_to_frame(ohlcv_list), repeats)
+    data_frame = charting.ohlcv_to_frame(ohlcv_list)
+    overlays = best_of(lambda: (
+        charting.sma(data_frame['Close'], 20),
+        charting.ema(data_frame['Close'], 50),
+        charting.vwap(data_frame),
+        charting.vwap_bands(data_frame)
+    ), repeats)
+
+    print(f"{candles} candles, best of {repeats}")
+    print(f"legacy ingestion:     {legacy * 1000:8.2f} ms")
+    print(f"vectorized ingestion: {vectorized * 1000:8.2f} ms ({legacy / vectorized:.1f}x faster)")
+    print(f"all overlays:         {overlays * 1000:8.2f} ms")
+
+if __name__ == '__main__':
+    import sys
+    main(*[int(arg) for arg in sys.argv[1:3]])
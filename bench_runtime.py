@@ -0,0 +1,274 @@
+import io
+import sys
+import time
+import random
+import asyncio
+import threading
+import functools
+import contextlib
+from types import SimpleNamespace
+
+#
+## Benchmark of the threaded and asyncio runtimes on their real handlers.
+## Chat messages go through handle_message and /price through price: bot.py's on its handler pools,
+## async_bot.py's on one event loop with its concurrent update limit. Both send moderation through the outbound queue.
+## Telegram, DexScreener and CoinGecko are stubbed with the same seeded latencies on both sides,
+## the market data cache is kept cold and flood and command limits are lifted, so only the execution model differs.
+## An update is done once its handler has returned and every Telegram call it made has completed.
+## Usage: python bench_runtime.py [updates] [rate per second]
+## The asyncio runtime needs python-telegram-bot 20+ (requirements-async.txt) and is skipped without it.
+#
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import bot
+    try:
+        import async_bot
+    except ImportError:
+        async_bot = None
+
+UPSTREAM_RESPONSES = {
+    'api.dexscreener.com': {'pairs': [{'quoteToken': {'symbol': 'WETH'}, 'priceNative': '0.0000125'}]},
+    'api.coingecko.com': {'ethereum': {'usd': 3000}},
+}
+
+def latency(rng):
+    # Log-normal call latencies, median about 80ms with a long tail
+    return min(rng.lognormvariate(-2.5, 0.6), 2.0)
+
+def make_workload(updates, rate, seed=7):
+    rng = random.Random(seed)
+    workload = []
+    at = 0.0
+    for index in range(updates):
+        at += rng.expovariate(rate)
+        workload.append(SimpleNamespace(
+            index=index,
+            at=at,
+            kind='price' if rng.random() < 0.2 else 'message',
+            chat_id=-1000 - rng.randrange(20),
+            user_id=rng.randrange(1, 5000),
+            text='join t.me/freetokens' if rng.random() < 0.1 else 'gm',
+            telegram_latency=latency(rng)
+        ))
+    return workload
+
+class Recorder:
+    """When each update finished: its handler returning or its last Telegram call completing, whichever is later."""
+    def __init__(self, workload):
+        self.kinds = [item.kind for item in workload]
+        self.arrived = [0.0] * len(workload)
+        self.done_at = [0.0] * len(workload)
+        self.handled = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def call_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def call_finished(self, index):
+        with self._lock:
+            self.in_flight -= 1
+            self.done_at[index] = max(self.done_at[index], time.perf_counter())
+
+    def handler_finished(self, index):
+        with self._lock:
+            self.handled += 1
+            self.done_at[index] = max(self.done_at[index], time.perf_counter())
+
+    def result(self):
+        """Return the run's length and each kind of update's latencies."""
+        latencies = {}
+        for kind, arrived, done in zip(self.kinds, self.arrived, self.done_at):
+            if done:
+                latencies.setdefault(kind, []).append(done - arrived)
+        return max(self.done_at) - min(self.arrived), latencies
+
+def blocking_calls(item, recorder):
+    def call(result):
+        def method(*args, **kwargs):
+            recorder.call_started()
+            time.sleep(item.telegram_latency)
+            recorder.call_finished(item.index)
+            return result
+        return method
+    return call
+
+def awaitable_calls(item, recorder):
+    def call(result):
+        async def method(*args, **kwargs):
+            recorder.call_started()
+            await asyncio.sleep(item.telegram_latency)
+            recorder.call_finished(item.index)
+            return result
+        return method
+    return call
+
+def fake_update(item, call):
+    """An Update and context for one workload item, with its Bot API methods stubbed by call."""
+    chat = SimpleNamespace(id=item.chat_id, type='supergroup')
+    user = SimpleNamespace(id=item.user_id, is_bot=False, username=f'user{item.user_id}', first_name='User')
+    sent = SimpleNamespace(chat=chat, message_id=1000000 + item.index)
+    message = SimpleNamespace(
+        text=item.text, chat=chat, chat_id=chat.id, from_user=user, message_id=item.index,
+        reply_text=call(sent), delete=call(True)
+    )
+    update = SimpleNamespace(effective_chat=chat, effective_user=user, message=message, callback_query=None)
+    context = SimpleNamespace(
+        args=['usd'] if item.kind == 'price' else [],
+        bot=SimpleNamespace(get_chat_administrators=call([]), restrict_chat_member=call(True)),
+        job_queue=SimpleNamespace(run_once=lambda *args, **kwargs: None),
+        chat_data={},
+        job=None
+    )
+    return update, context
+
+class StubResponse:
+    def __init__(self, url):
+        self.status_code = self.status = 200
+        self._data = UPSTREAM_RESPONSES[url.split('/')[2]]
+
+    def raise_for_status(self):
+        pass
+
+    def json(self, **kwargs):
+        return self._data
+
+class StubSession:
+    """requests.Session for HttpClient, answering every GET after an upstream latency."""
+    def __init__(self, rng):
+        self.rng = rng
+
+    def get(self, url, **kwargs):
+        time.sleep(latency(self.rng))
+        return StubResponse(url)
+
+class StubClientSession(StubSession):
+    """aiohttp.ClientSession for AsyncHttpClient."""
+    @contextlib.asynccontextmanager
+    async def get(self, url, **kwargs):
+        await asyncio.sleep(latency(self.rng))
+        response = StubResponse(url)
+        data = response.json()
+
+        async def json(**kwargs):
+            return data
+        response.json = json
+        yield response
+
+def reset_state():
+    # Each runtime starts with empty spam windows and admin lists, and without command limits
+    bot.anti_spam = bot.AntiSpam(bot.anti_spam.rate_limit, bot.anti_spam.time_window, bot.anti_spam.mute_time)
+    bot.admin_cache = bot.AdminCache(ttl=bot.admin_cache.ttl)
+    bot.command_limiter = bot.CommandRateLimiter(10 ** 9, 10 ** 9, 10 ** 9, bot.TIME_PERIOD)
+
+def run_threaded(workload):
+    recorder = Recorder(workload)
+    reset_state()
+    bot.market_data = bot.MarketDataCache(ttl=0, stale_ttl=0)
+    session = StubSession(random.Random(11))
+    bot.http._session = lambda host: session
+    fresh_outbound()
+
+    def finishing(callback):
+        @functools.wraps(callback)
+        def run(update, context):
+            try:
+                callback(update, context)
+            finally:
+                recorder.handler_finished(update.message.message_id)
+        return run
+
+    # The same concurrency classes main() registers them under
+    handlers = {
+        'message': bot.pooled('moderation', finishing(bot.handle_message)),
+        'price': bot.pooled('heavy', finishing(bot.price)),
+    }
+    shed_before = sum(pool.shed for pool in bot.handler_pools.values())
+
+    # This thread plays the Dispatcher, handing each update to its pool as it arrives
+    started = time.perf_counter()
+    for item in workload:
+        delay = started + item.at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        recorder.arrived[item.index] = time.perf_counter()
+        handlers[item.kind](*fake_update(item, blocking_calls(item, recorder)))
+
+    def idle():
+        shed = sum(pool.shed for pool in bot.handler_pools.values()) - shed_before
+        return recorder.handled + shed >= len(workload) and sends_idle(recorder)
+
+    while not (idle() and (time.sleep(0.05) or idle())):
+        time.sleep(0.05)
+    return recorder.result() + (sum(pool.shed for pool in bot.handler_pools.values()) - shed_before,)
+
+def sends_idle(recorder):
+    return recorder.in_flight == 0 and bot.outbound._queue.empty() and not bot.outbound._deferred
+
+def fresh_outbound(loop=None):
+    bot.outbound = bot.OutboundQueue(global_rate=10 ** 6, chat_rate=10 ** 6, chat_period=60, workers=bot.outbound.workers)
+    bot.outbound.start(None, loop)
+
+def run_asyncio(workload):
+    recorder = Recorder(workload)
+    reset_state()
+    bot.market_data = bot.MarketDataCache(ttl=0, stale_ttl=0)
+    async_bot.market_data = async_bot.AsyncMarketData(bot.market_data)
+    async_bot.http._client = StubClientSession(random.Random(11))
+    handlers = {'message': async_bot.handle_message, 'price': async_bot.price}
+
+    async def handle(item, limit):
+        async with limit:
+            try:
+                await handlers[item.kind](*fake_update(item, awaitable_calls(item, recorder)))
+            finally:
+                recorder.handler_finished(item.index)
+
+    async def main():
+        fresh_outbound(asyncio.get_running_loop())
+        # Application.concurrent_updates is a semaphore over the updates being handled
+        limit = asyncio.Semaphore(async_bot.async_config.get('concurrentUpdates', 256))
+        tasks = []
+        started = time.perf_counter()
+        for item in workload:
+            delay = started + item.at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            recorder.arrived[item.index] = time.perf_counter()
+            tasks.append(asyncio.create_task(handle(item, limit)))
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while not (sends_idle(recorder) and (await asyncio.sleep(0.05) or sends_idle(recorder))):
+            await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    return recorder.result() + (0,)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def report(name, elapsed, latencies, shed):
+    handled = sum(len(values) for values in latencies.values())
+    print(f"{name:<28} {handled / elapsed:8.1f} updates/s   shed {shed}")
+    for kind, values in sorted(latencies.items()):
+        print(f"  {kind:<26} p50 {percentile(values, 0.5) * 1000:8.0f} ms   p99 {percentile(values, 0.99) * 1000:8.0f} ms")
+
+def main(updates=500, rate=50):
+    workload = make_workload(updates, rate)
+    print(f"{updates} updates arriving at {rate}/s, {sum(item.kind == 'price' for item in workload)} of them /price")
+
+    pools = bot.handler_pools
+    with contextlib.redirect_stdout(io.StringIO()):
+        threaded = run_threaded(workload)
+    report(f"threaded ({pools['moderation'].workers}+{pools['heavy'].workers} workers)", *threaded)
+
+    if async_bot is None:
+        print("asyncio runtime skipped, it needs python-telegram-bot 20+ (pip install -r requirements-async.txt)")
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        in_asyncio = run_asyncio(workload)
+    report(f"asyncio ({async_bot.async_config.get('concurrentUpdates', 256)} in flight)", *in_asyncio)
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
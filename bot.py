@@ -1,22 +1,41 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
+import io
 import os
 import re
-import time
+import sys
 import json
+import hashlib
+import hmac
+import ssl
+import secrets
+import sqlite3
+import heapq
+import asyncio
+import queue
+import itertools
 import random
 import requests
+import requests.adapters
 import telegram
 import threading
-import pandas as pd
-import firebase_admin
-import mplfinance as mpf
-from web3 import Web3
+import multiprocessing
 from decimal import Decimal
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from datetime import datetime, timedelta
-from collections import deque, defaultdict
-from firebase_admin import credentials, firestore
+from collections import deque, defaultdict, OrderedDict
 from telegram import Update, ChatPermissions, InlineKeyboardButton, InlineKeyboardMarkup, Bot, ChatMember
-from telegram.ext import Updater, CommandHandler, CallbackContext, MessageHandler, Filters, CallbackQueryHandler, JobQueue
+from telegram.ext import Updater, CommandHandler, CallbackContext, MessageHandler, CallbackQueryHandler, ChatMemberHandler, JobQueue
+try:
+    from telegram.ext import Filters
+except ImportError:
+    Filters = None  # python-telegram-bot 20+, which only async_bot.py runs on
 
 #
 ## This bot was developed by Tukyo Games for the deSypher project.
@@ -40,13 +59,17 @@ from telegram.ext import Updater, CommandHandler, CallbackContext, MessageHandle
 #
 ## Ethereum Commands
 ### /price - Get the price of the SYPHER token in USD
-### /chart - Links to the token chart on various platforms
+### /chart - Candlestick chart with links to the token chart on various platforms
+#### /chart [m|h|d] /chart [interval] [range] e.g. /chart 4h 7d
+#### Add sma, ema (optionally with a period like sma50), vwap or bands for indicator overlays
 ### /liquidity /lp - View the liquidity value of the SYPHER V3 pool
 ### /volume - 24-hour trading volume of the SYPHER token
+### /stats - Price, liquidity, volume and transactions of the SYPHER V3 pool
 #
 ## Admin Commands
 ### /adminhelp - Get a list of admin commands
 ### /cleanbot - Clean all bot messages in the chat
+### /status - Show upstream API health
 ### /cleargames - Clear all active games in the chat
 ### /antiraid - Manage the anti-raid system
 #### /antiraid end /anti-raid [user_amount] [time_out] [anti_raid_time]
@@ -58,6 +81,82 @@ from telegram.ext import Updater, CommandHandler, CallbackContext, MessageHandle
 ### /filterlist - Get a list of filtered words
 #
 
+#region Startup
+# Cold-start cost per component, in seconds, in the order each one finished
+startup_timings = OrderedDict()
+startup_timings['imports'] = time.perf_counter() - STARTUP_STARTED
+
+class LazyResource:
+    """Builds a heavy client once, on first use or in the background, and tracks whether it is usable."""
+    INITIALIZING = 'initializing'
+    READY = 'ready'
+    DEGRADED = 'degraded'
+
+    def __init__(self, name, factory, retry_after=30):
+        self.name = name
+        self.factory = factory
+        self.retry_after = retry_after  # Seconds a failed build is reported before get() tries again
+        self.state = None  # None until started, then initializing, ready or degraded
+        self.error = None
+        self._lock = threading.Lock()
+        self._value = None
+        self._failed_at = 0
+
+    def start(self):
+        """Build the client on a background thread and return immediately."""
+        if self.state is None:
+            self.state = self.INITIALIZING
+            threading.Thread(target=self._build_quietly, name=f'init-{self.name}', daemon=True).start()
+
+    def is_ready(self):
+        return self._value is not None
+
+    def get(self):
+        if self._value is None:
+            return self._build()
+        return self._value
+
+    def _build_quietly(self):
+        try:
+            self._build()
+        except Exception:
+            pass  # Already reported as degraded
+
+    def _build(self):
+        # Callers wait here while another thread is building
+        with self._lock:
+            if self._value is not None:
+                return self._value
+            if self.state == self.DEGRADED and time.time() - self._failed_at < self.retry_after:
+                raise RuntimeError(f"{self.name} unavailable: {self.error}")
+
+            self.state = self.INITIALIZING
+            started = time.perf_counter()
+            try:
+                value = self.factory()
+            except Exception as e:
+                self.state = self.DEGRADED
+                self.error = str(e)
+                self._failed_at = time.time()
+                print(f"{self.name} degraded: {e}")
+                raise
+            startup_timings[self.name] = time.perf_counter() - started
+            self._value = value
+            self.state = self.READY
+            self.error = None
+            print(f"{self.name} ready in {startup_timings[self.name]:.2f}s")
+            return value
+
+def startup_report():
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in startup_timings.items())
+
+def subsystem_report(*resources):
+    return ", ".join(
+        f"{resource.name} {resource.state or 'not started'}" + (f" ({resource.error})" if resource.error else "")
+        for resource in resources
+    )
+#endregion Startup
+
 with open('config.json') as f:
     config = json.load(f)
 
@@ -71,22 +170,32 @@ CHAT_ID = os.getenv('CHAT_ID')
 BASE_ENDPOINT = os.getenv('ENDPOINT')
 BASESCAN_API_KEY = os.getenv('BASESCAN_API')
 
-web3 = Web3(Web3.HTTPProvider(BASE_ENDPOINT))
 contract_address = config['contractAddress']
 pool_address = config['lpAddress']
 abi = config['abi']
 
-eth_address_pattern = re.compile(r'\b0x[a-fA-F0-9]{40}\b')
-telegram_links_pattern = re.compile(r't.me/\S+')
-
-if web3.is_connected():
-    network_id = web3.net.version
+# Addresses and Telegram links in one scan over the lowercased message text
+moderation_pattern = re.compile(r'(?P<address>\b0x[a-f0-9]{40}\b)|(?P<link>t\.me/\S+)')
+allowed_addresses = frozenset([config['contractAddress'].lower(), config['lpAddress'].lower()])
+allowed_links = frozenset([
+    't.me/tukyogames',
+    't.me/tukyowave',
+    't.me/tukyogamesannouncements'
+])
+
+def connect_web3():
+    from web3 import Web3
+
+    w3 = Web3(Web3.HTTPProvider(BASE_ENDPOINT))
+    if not w3.is_connected():
+        raise ConnectionError("RPC endpoint unreachable")
+    network_id = w3.net.version
     print(f"Connected to Ethereum node on network {network_id}")
-else:
-    print("Failed to connect")
+    return w3
 
-# Create a contract instance
-contract = web3.eth.contract(address=contract_address, abi=abi)
+# web3 is imported in the background at startup, or on first use if that comes sooner
+web3 = LazyResource('web3', connect_web3)
+contract = LazyResource('contract', lambda: web3.get().eth.contract(address=contract_address, abi=abi))
 
 #region Firebase
 FIREBASE_TYPE= os.getenv('FIREBASE_TYPE')
@@ -100,143 +209,1245 @@ FIREBASE_TOKEN_URI= os.getenv('FIREBASE_TOKEN_URI')
 FIREBASE_AUTH_PROVIDER_X509_CERT_URL= os.getenv('FIREBASE_AUTH_PROVIDER_X509_CERT_URL')
 FIREBASE_CLIENT_X509_CERT_URL= os.getenv('FIREBASE_CLIENT_X509_CERT_URL')
 
-cred = credentials.Certificate({
-    "type": FIREBASE_TYPE,
-    "project_id": FIREBASE_PROJECT_ID,
-    "private_key_id": FIREBASE_PRIVATE_KEY_ID,
-    "private_key": FIREBASE_PRIVATE_KEY,
-    "client_email": FIREBASE_CLIENT_EMAIL,
-    "client_id": FIREBASE_CLIENT_ID,
-    "auth_uri": FIREBASE_AUTH_URL,
-    "token_uri": FIREBASE_TOKEN_URI,
-    "auth_provider_x509_cert_url": FIREBASE_AUTH_PROVIDER_X509_CERT_URL,
-    "client_x509_cert_url": FIREBASE_CLIENT_X509_CERT_URL
-})
-
-firebase_admin.initialize_app(cred)
-
-db = firestore.client()
-
-print("Firebase initialized.")
+def connect_firebase():
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    cred = credentials.Certificate({
+        "type": FIREBASE_TYPE,
+        "project_id": FIREBASE_PROJECT_ID,
+        "private_key_id": FIREBASE_PRIVATE_KEY_ID,
+        "private_key": FIREBASE_PRIVATE_KEY,
+        "client_email": FIREBASE_CLIENT_EMAIL,
+        "client_id": FIREBASE_CLIENT_ID,
+        "auth_uri": FIREBASE_AUTH_URL,
+        "token_uri": FIREBASE_TOKEN_URI,
+        "auth_provider_x509_cert_url": FIREBASE_AUTH_PROVIDER_X509_CERT_URL,
+        "client_x509_cert_url": FIREBASE_CLIENT_X509_CERT_URL
+    })
+
+    firebase_admin.initialize_app(cred)
+    client = firestore.client()
+    print("Firebase initialized.")
+    return client
+
+firebase = LazyResource('firebase', connect_firebase)
 
 #region Database Slash Commands
 def filter(update, context):
     if is_user_admin(update, context):
+        if warming_up(update, firebase):
+            return
 
         command_text = update.message.text[len('/filter '):].strip().lower()
 
         if not command_text:
-            update.message.reply_text("Please provide some text to filter.")
+            reply(update, "Please provide some text to filter.")
             return
         
         # Create or update the document in the 'filtered-words' collection
-        doc_ref = db.collection('filters').document(command_text)
+        doc_ref = firebase.get().collection('filters').document(command_text)
 
         # Check if document exists
         doc = doc_ref.get()
         if doc.exists:
-            update.message.reply_text(f"'{command_text}' is already filtered.")
+            reply(update, f"'{command_text}' is already filtered.")
         else:
             # If document does not exist, create it with initial values
             doc_ref.set({
                 'text': command_text,
             })
+            phrase_filter.add(command_text)
 
-            update.message.reply_text(f"'{command_text}' filtered!")
+            reply(update, f"'{command_text}' filtered!")
 
 def remove_filter(update, context):
     if is_user_admin(update, context):
+        if warming_up(update, firebase):
+            return
 
         command_text = update.message.text[len('/removefilter '):].strip().lower()
 
         if not command_text:
-            update.message.reply_text("Please provide some text to remove.")
+            reply(update, "Please provide some text to remove.")
             return
 
         # Get the document in the 'filtered-words' collection
-        doc_ref = db.collection('filters').document(command_text)
+        doc_ref = firebase.get().collection('filters').document(command_text)
 
         # Check if document exists
         doc = doc_ref.get()
         if doc.exists:
             # If document exists, delete it
             doc_ref.delete()
-            update.message.reply_text(f"'{command_text}' removed from filters!")
+            phrase_filter.remove(command_text)
+            reply(update, f"'{command_text}' removed from filters!")
         else:
-            update.message.reply_text(f"'{command_text}' is not in the filters.")
+            reply(update, f"'{command_text}' is not in the filters.")
 
 def filter_list(update, context):
     if is_user_admin(update, context):
-        docs = db.collection('filters').stream()
-
-        filters = [doc.id for doc in docs]
-        message = "\n".join(filters)
+        filters = sorted(phrase_filter.phrases())
+        message = "\n".join(filters) if filters else "No filtered words or phrases."
 
-        update.message.reply_text(message)
+        reply(update, message)
 
 def warn(update, context):
     if is_user_admin(update, context):
+        if warming_up(update, firebase):
+            return
 
         user_id = update.message.reply_to_message.from_user.id
 
-        doc_ref = db.collection('warns').document(str(user_id))
+        warnings = warn_counter.add(user_id)
+        reply(update, f"{user_id} has been warned. Total warnings: {warnings}")
+        check_warns(update, context, user_id, warnings)
 
-        doc = doc_ref.get()
+def check_warns(update, context, user_id, warnings):
+    if warnings >= MAX_WARNINGS:
+        dispatch(PRIORITY_MODERATION, update.message.chat.id, context.bot.ban_chat_member, update.message.chat.id, user_id)
+        reply(update, f"Goodbye {user_id}!")
+#endregion Database Slash Commands
+
+def on_filters_snapshot(col_snapshot, changes, read_time):
+    # Keep the resident phrase index in sync with the 'filters' collection
+    added = [change.document.id for change in changes if change.type.name in ('ADDED', 'MODIFIED')]
+    removed = [change.document.id for change in changes if change.type.name == 'REMOVED']
+    phrase_filter.update(added=added, removed=removed)
+    print(f"Filter index synced: +{len(added)} -{len(removed)} ({len(phrase_filter)} phrases)")
+
+def watch_filters():
+    # Moderation runs on address and link checks alone until Firestore is reachable
+    while True:
+        try:
+            return firebase.get().collection('filters').on_snapshot(on_filters_snapshot)
+        except Exception as e:
+            print(f"Failed to watch filters: {e}")
+            time.sleep(firebase.retry_after)
+
+#endregion Firebase
+
+#region Classes
+class PhraseFilter:
+    """Aho-Corasick matcher over the filtered phrases, rebuilt on change and matched in one pass."""
+    def __init__(self, phrases=()):
+        self._lock = threading.Lock()
+        self._phrases = set()
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+        self.update(added=phrases)
+
+    def __len__(self):
+        return len(self._phrases)
+
+    def phrases(self):
+        return set(self._phrases)
+
+    def add(self, phrase):
+        self.update(added=[phrase])
+
+    def remove(self, phrase):
+        self.update(removed=[phrase])
+
+    def update(self, added=(), removed=()):
+        with self._lock:
+            phrases = set(self._phrases)
+            phrases.difference_update(phrase.lower() for phrase in removed)
+            phrases.update(phrase.lower() for phrase in added if phrase)
+            goto, fail, output = self._build(phrases)
+            # Swap in the new automaton in one step so readers never see a partial build
+            self._phrases, self._goto, self._fail, self._output = phrases, goto, fail, output
+
+    @staticmethod
+    def _build(phrases):
+        goto = [{}]
+        output = [None]
+        for phrase in phrases:
+            node = 0
+            for char in phrase:
+                next_node = goto[node].get(char)
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][char] = next_node
+                    goto.append({})
+                    output.append(None)
+                node = next_node
+            output[node] = phrase
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                if output[child] is None:
+                    output[child] = output[fail[child]]
+        return goto, fail, output
+
+    def find(self, text):
+        """Return the first filtered phrase found in the lowercased text, or None."""
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node] is not None:
+                return output[node]
+        return None
+
+class OutboundQueue:
+    """Prioritised Telegram sender that paces calls to the global and per-chat flood limits."""
+    def __init__(self, global_rate, chat_rate, chat_period, workers=4, max_retries=3):
+        self.chat_rate = chat_rate
+        self.chat_period = chat_period
+        self.workers = workers
+        self.max_retries = max_retries
+        self.bot = None
+        self.loop = None
+        self.global_bucket = TokenBucket(global_rate, 1)
+        self._chat_buckets = {}
+        self._queue = queue.PriorityQueue()
+        self._deferred = []  # Heap of (ready_at, item) waiting out a flood limit or backoff
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        print(f"Initialized OutboundQueue with global_rate={global_rate}/s, chat_rate={chat_rate}/{chat_period}s, workers={workers}")
+
+    def start(self, bot, loop=None):
+        """Start the senders, with loop set when bot is python-telegram-bot 20+'s and its calls are coroutines."""
+        self.bot = bot
+        self.loop = loop
+        for index in range(self.workers):
+            threading.Thread(target=self._run, name=f'outbound-{index}', daemon=True).start()
+
+    def submit(self, priority, chat_id, func, /, *args, **kwargs):
+        future = Future()
+        self._queue.put([priority, next(self._sequence), chat_id, func, args, kwargs, future, 0])
+        return future
+
+    def _defer(self, item, delay):
+        with self._lock:
+            heapq.heappush(self._deferred, (time.monotonic() + delay, item[1], item))
+
+    def _promote_deferred(self):
+        # Move items whose wait is over back onto the main queue
+        now = time.monotonic()
+        with self._lock:
+            while self._deferred and self._deferred[0][0] <= now:
+                self._queue.put(heapq.heappop(self._deferred)[2])
+            return self._deferred[0][0] - now if self._deferred else None
+
+    def _chat_bucket(self, chat_id):
+        with self._lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_period)
+            return bucket
+
+    def _run(self):
+        while True:
+            next_ready = self._promote_deferred()
+            try:
+                item = self._queue.get(timeout=min(next_ready, 0.5) if next_ready is not None else 0.5)
+            except queue.Empty:
+                continue
+            priority, _, chat_id, func, args, kwargs, future, attempts = item
+            if future.cancelled():
+                continue  # The caller stopped waiting before it went out
+
+            # Moderation actions and cleanup deletes are not messages, so only sends count against the chat's budget
+            if chat_id is not None and priority not in (PRIORITY_MODERATION, PRIORITY_CLEANUP):
+                bucket = self._chat_bucket(chat_id)
+                if not bucket.consume():
+                    self._defer(item, bucket.time_until_available())
+                    continue
+
+            while not self.global_bucket.consume():
+                time.sleep(self.global_bucket.time_until_available())
+
+            # Once running it can no longer be cancelled, retries included
+            if attempts == 0 and not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                self._rewind(args, kwargs)
+                result = func(*args, **kwargs)
+                if asyncio.iscoroutine(result):
+                    # The async runtime's calls are made on the event loop that owns its bot
+                    result = asyncio.run_coroutine_threadsafe(result, self.loop).result()
+                future.set_result(result)
+            except telegram.error.RetryAfter as e:
+                self._retry(item, e, e.retry_after)
+            except telegram.error.BadRequest as e:
+                future.set_exception(e)
+            except telegram.error.TimedOut as e:
+                if self._is_send(func):
+                    # A timed out send may still have been delivered, so retrying it could post it twice
+                    future.set_exception(e)
+                else:
+                    self._retry(item, e, 2 ** attempts + random.random())
+            except telegram.error.NetworkError as e:
+                # Timeouts and connection drops back off exponentially with jitter
+                self._retry(item, e, 2 ** attempts + random.random())
+            except Exception as e:
+                future.set_exception(e)
+
+    @staticmethod
+    def _is_send(func):
+        # Sends are not idempotent, while deletes, restricts and edits can safely be repeated
+        return getattr(func, '__name__', '').startswith(('send_', 'reply_', 'forward_', 'copy_'))
+
+    @staticmethod
+    def _rewind(args, kwargs):
+        # Uploads read their stream to EOF, so a retry has to start it over
+        for value in itertools.chain(args, kwargs.values()):
+            if hasattr(value, 'read') and hasattr(value, 'seek'):
+                value.seek(0)
+
+    def _retry(self, item, error, delay):
+        item[7] += 1
+        if item[7] > self.max_retries:
+            print(f"Giving up on outbound call after {self.max_retries} retries: {error}")
+            item[6].set_exception(error)
+            return
+        print(f"Outbound call failed ({error}), retrying in {delay:.1f}s")
+        self._defer(item, delay)
+
+    def pending(self):
+        with self._lock:
+            return self._queue.qsize() + len(self._deferred)
+
+class MessageTracker:
+    def __init__(self, max_per_chat, max_age):
+        self.max_per_chat = max_per_chat
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._chats = {}  # chat_id -> deque of (message_id, sent_at), oldest first
+
+    def track(self, chat_id, message_id):
+        with self._lock:
+            messages = self._chats.get(chat_id)
+            if messages is None:
+                messages = self._chats[chat_id] = deque(maxlen=self.max_per_chat)
+            messages.append((message_id, time.time()))
+
+    def _drop_expired(self, messages, cutoff):
+        while messages and messages[0][1] < cutoff:
+            messages.popleft()
+
+    def pop_chat(self, chat_id):
+        """Forget and return the ids of this chat's messages that can still be deleted."""
+        with self._lock:
+            messages = self._chats.pop(chat_id, None)
+        if not messages:
+            return []
+        self._drop_expired(messages, time.time() - self.max_age)
+        return [message_id for message_id, _ in messages]
+
+    def prune(self):
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            for chat_id in list(self._chats):
+                self._drop_expired(self._chats[chat_id], cutoff)
+                if not self._chats[chat_id]:
+                    del self._chats[chat_id]
+
+    def __len__(self):
+        # Iterating while a handler tracks a message in a new chat would change the dict's size mid-sum
+        with self._lock:
+            return sum(len(messages) for messages in self._chats.values())
+
+class MarketDataCache:
+    """TTL cache for upstream market data with single-flight fetches and stale-while-revalidate."""
+    class Flight:
+        __slots__ = ('done', 'value')
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.value = None
+
+    def __init__(self, ttl, stale_ttl, fetch_timeout=30):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl  # How long past the TTL a value is served while it refreshes
+        self.fetch_timeout = fetch_timeout
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (value, fetched_at)
+        self._flights = {}  # key -> Flight for fetches in progress
+        print(f"Initialized MarketDataCache with ttl={ttl}, stale_ttl={stale_ttl}")
+
+    def get(self, key, fetch, ttl=None):
+        value, refresh = self._lookup(key, ttl)
+        if not refresh:
+            return value
+        if value is not None:
+            self._refresh_in_background(key, fetch)
+            return value
+
+        value = self._fetch(key, fetch)
+        if value is None:
+            self._report_expired(key)
+        return value
+
+    # Freshness rules shared with AsyncMarketData in async_bot.py
+    def _lookup(self, key, ttl=None):
+        """Return the value to serve, None when there is none or it is past the stale window, and whether to fetch."""
+        ttl = self.ttl if ttl is None else ttl
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, True
+        age = time.time() - entry[1]
+        if age < ttl:
+            return entry[0], False
+        # Within the stale window the old value is served while it refreshes
+        return (entry[0] if age < ttl + self.stale_ttl else None), True
+
+    def _report_expired(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            # Past the stale window an old value is worse than none, so callers see the failure
+            print(f"Market data for {key} is {time.time() - entry[1]:.0f}s old and could not be refreshed, not serving it")
+
+    def put(self, key, value):
+        if value is not None:
+            with self._lock:
+                self._entries[key] = (value, time.time())
+
+    def peek(self, key):
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def _refresh_in_background(self, key, fetch):
+        if key not in self._flights:
+            threading.Thread(target=self._fetch, args=(key, fetch), daemon=True).start()
+
+    def _fetch(self, key, fetch):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = MarketDataCache.Flight()
+
+        # Concurrent callers wait for the leader's fetch instead of starting their own
+        if not leader:
+            flight.done.wait(self.fetch_timeout)
+            return flight.value
+
+        try:
+            flight.value = fetch()
+            self.put(key, flight.value)
+        except Exception as e:
+            print(f"Failed to fetch market data for {key}: {e}")
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value
+
+class ChartCache:
+    """Small LRU of rendered charts, holding PNG bytes until Telegram hands back a file_id."""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._charts = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            photo = self._charts.get(key)
+            if photo is not None:
+                self._charts.move_to_end(key)
+            return photo
+
+    def put(self, key, photo):
+        with self._lock:
+            self._charts[key] = photo
+            self._charts.move_to_end(key)
+            while len(self._charts) > self.max_entries:
+                self._charts.popitem(last=False)
+
+class ChartRenderer:
+    """Warm process pool for chart rendering, so plotting never holds the GIL in a handler thread."""
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._pool = None
+        print(f"Initialized ChartRenderer with workers={workers}, max_pending={max_pending}")
+
+    def start(self):
+        import charting
+
+        with self._lock:
+            if self._pool is None:
+                # Spawned workers import only charting.py, not this module and its clients
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=charting.init_worker
+                )
+                for _ in range(self.workers):
+                    self._pool.submit(charting.warm_up)
+            return self._pool
+
+    def is_saturated(self):
+        return self._pending >= self.workers
+
+    def submit(self, data_frame, overlays=()):
+        """Queue a render, or return None when the queue is full."""
+        import charting
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+        try:
+            pool = self.start()
+            try:
+                future = pool.submit(charting.render_chart, data_frame, overlays)
+            except BrokenProcessPool:
+                # A worker died and took the pool with it, so retry once on a fresh one
+                self._discard(pool)
+                pool = self.start()
+                future = pool.submit(charting.render_chart, data_frame, overlays)
+        except Exception:
+            self._finished(None, None)
+            raise
+        future.add_done_callback(lambda done: self._finished(done, pool))
+        return future
+
+    def _finished(self, future, pool):
+        with self._lock:
+            self._pending -= 1
+        if future is not None and not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard(pool)
+
+    def _discard(self, pool):
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        print("Chart render pool is broken, a new one starts with the next chart")
+        pool.shutdown(wait=False)
+
+class CandleStore:
+    """Append-only SQLite store of the pool's minute candles."""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS candles ('
+            'timestamp INTEGER PRIMARY KEY, open REAL, high REAL, low REAL, close REAL, volume REAL)'
+        )
+        # Oldest candle from which the store runs without gaps up to the newest one
+        self._conn.execute('CREATE TABLE IF NOT EXISTS coverage (id INTEGER PRIMARY KEY CHECK (id = 0), since INTEGER)')
+        self._conn.commit()
+        self._last_timestamp = self._conn.execute('SELECT MAX(timestamp) FROM candles').fetchone()[0]
+        covered = self._conn.execute('SELECT since FROM coverage').fetchone()
+        self._covered_since = covered[0] if covered else self._conn.execute('SELECT MIN(timestamp) FROM candles').fetchone()[0]
+        print(f"Initialized CandleStore at {path}, candles {self._covered_since} to {self._last_timestamp}")
+
+    def last_timestamp(self):
+        return self._last_timestamp
+
+    def covered_since(self):
+        return self._covered_since
+
+    def covers(self, since):
+        return self._covered_since is not None and self._covered_since <= since
+
+    def add(self, candles, contiguous=True):
+        """Store candles; contiguous=False means they do not reach back to the stored ones."""
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?)', [tuple(candle[:6]) for candle in candles])
+            if self._covered_since is None or not contiguous:
+                self._covered_since = min(candle[0] for candle in candles)
+                self._conn.execute('INSERT OR REPLACE INTO coverage VALUES (0, ?)', (self._covered_since,))
+            self._conn.commit()
+            newest = max(candle[0] for candle in candles)
+            if self._last_timestamp is None or newest > self._last_timestamp:
+                self._last_timestamp = newest
+
+    def load(self, since):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT timestamp, open, high, low, close, volume FROM candles WHERE timestamp >= ? ORDER BY timestamp',
+                (since,)
+            ).fetchall()
+
+class AssetRegistry:
+    """Remembers the Telegram file_id of each uploaded asset, keyed by content hash and persisted in Firestore."""
+    def __init__(self, base_dir, collection):
+        self.base_dir = base_dir
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._hashes = {}  # name -> (mtime, sha256)
+        self._file_ids = {}  # sha256 -> file_id, None when known not to be uploaded
+
+    def _digest(self, name):
+        path = os.path.join(self.base_dir, name)
+        mtime = os.path.getmtime(path)
+        cached = self._hashes.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        self._hashes[name] = (mtime, digest.hexdigest())
+        return digest.hexdigest()
+
+    def _file_id(self, digest):
+        # Upload instead of waiting on Firestore while it is still starting
+        if digest not in self._file_ids and firebase.is_ready():
+            doc = firebase.get().collection(self.collection).document(digest).get()
+            self._file_ids[digest] = doc.to_dict().get('file_id') if doc.exists else None
+        return self._file_ids.get(digest)
+
+    def _remember(self, digest, name, file_id):
+        with self._lock:
+            self._file_ids[digest] = file_id
+        try:
+            firebase.get().collection(self.collection).document(digest).set({'name': name, 'file_id': file_id})
+        except Exception as e:
+            print(f"Failed to persist file_id for {name}: {e}")
+
+    @staticmethod
+    def _uploaded_file_id(message):
+        for media in (message.animation, message.video, message.document, message.audio):
+            if media is not None:
+                return media.file_id
+        if message.photo:
+            return message.photo[-1].file_id
+        return None
+
+    def send(self, bot, chat_id, name, kind, **kwargs):
+        send_media = getattr(bot, f'send_{kind}')
+        digest = self._digest(name)
+        file_id = self._file_id(digest)
+
+        if file_id is not None:
+            try:
+                return dispatch(PRIORITY_CHAT, chat_id, send_media, chat_id=chat_id, **{kind: file_id}, **kwargs)
+            except telegram.error.BadRequest as e:
+                # file_ids belong to one bot token, so fall back to a fresh upload
+                print(f"Cached file_id for {name} was rejected: {e}")
+
+        with open(os.path.join(self.base_dir, name), 'rb') as media:
+            message = dispatch(PRIORITY_CHAT, chat_id, send_media, chat_id=chat_id, **{kind: media}, **kwargs)
+
+        file_id = self._uploaded_file_id(message)
+        if file_id is not None:
+            self._remember(digest, name, file_id)
+            print(f"Uploaded {name}, file_id cached")
+        return message
+
+class LogScanner:
+    """Scans pool-to-buyer Transfer logs with eth_getLogs over adaptive ranges, checkpointed in Firestore."""
+    def __init__(self, checkpoint_ref, confirmations, max_catchup, min_chunk=10, max_chunk=2000, w3=None):
+        self.checkpoint_ref = checkpoint_ref
+        self.confirmations = confirmations  # Recent blocks re-checked every scan in case of a reorg
+        self.max_catchup = max_catchup  # Most blocks replayed after downtime
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.chunk = min_chunk
+        self.w3 = web3.get() if w3 is None else w3  # AsyncLogScanner in async_bot.py passes its AsyncWeb3
+        self.transfer_event = self.w3.eth.contract(address=contract_address, abi=abi).events.Transfer()
+        self.topics = [
+            self.w3.to_hex(self.w3.keccak(text='Transfer(address,address,uint256)')),
+            '0x' + pool_address[2:].lower().rjust(64, '0')  # Indexed 'from' must be the pool
+        ]
+        self._seen = {}  # (transaction hash, log index) -> block number, for logs inside the window
+        self._window_scanned = False
+        self._last_block = self._load_checkpoint()  # Scanned so far by this process
+        self._saved_block = self._last_block  # Persisted, only once the buys up to it have been handled
+        print(f"Initialized LogScanner from block {self._last_block}, confirmations={confirmations}")
+
+    def _load_checkpoint(self):
+        doc = self.checkpoint_ref.get()
+        return doc.to_dict().get('last_block') if doc.exists else None
+
+    def commit(self, pending_block=None):
+        """Persist the scanned range, stopping short of pending_block while a buy from it is still unhandled."""
+        block_number = self._last_block if pending_block is None else min(self._last_block, pending_block - 1)
+        if self._saved_block is not None and block_number <= self._saved_block:
+            return
+        self._saved_block = block_number
+        self.checkpoint_ref.set({'last_block': block_number, 'updated': time.time()})
+
+    def _get_logs(self, from_block, to_block):
+        return self.w3.eth.get_logs(self._log_filter(from_block, to_block))
+
+    def scan(self):
+        """Return the decoded Transfer events that have not been seen yet, oldest first.
+
+        Nothing is persisted here, call commit() once the events have been handled.
+        """
+        head = self.w3.eth.block_number
+        from_block = self._first_block(head)
+        if from_block is None:
+            return []
+        events = []
+        seen = {}
+
+        # Progress is only kept once every chunk has been read, so a failed scan is retried whole
+        while from_block <= head:
+            to_block = min(from_block + self.chunk - 1, head)
+            try:
+                logs = self._get_logs(from_block, to_block)
+            except Exception as e:
+                if not self._shrink(from_block, to_block, e):
+                    raise
+                continue
+            self._take(logs, seen, events)
+            from_block = to_block + 1
+
+        self._finish(head, seen)
+        return events
+
+    # Scan steps shared with AsyncLogScanner in async_bot.py
+    def _log_filter(self, from_block, to_block):
+        return {
+            'address': contract_address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': self.topics
+        }
+
+    def _first_block(self, head):
+        """Return the block to scan from, or None on the first scan, which starts from head without replaying."""
+        if self._last_block is None:
+            self._last_block = head
+            return None
+
+        # Re-check the confirmation window only once this process has scanned it itself
+        rescan = self.confirmations if self._window_scanned else 0
+        return max(self._last_block + 1 - rescan, head - self.max_catchup)
+
+    def _shrink(self, from_block, to_block, error):
+        """Halve the range after eth_getLogs failed, returning False when it is already at its smallest."""
+        if self.chunk <= self.min_chunk:
+            return False
+        # Providers cap ranges and result sizes differently, so shrink and retry
+        self.chunk = max(self.min_chunk, self.chunk // 2)
+        print(f"eth_getLogs failed for {from_block}-{to_block} ({error}), shrinking range to {self.chunk}")
+        return True
+
+    def _take(self, logs, seen, events):
+        for log in logs:
+            key = (log['transactionHash'], log['logIndex'])
+            if log.get('removed') or key in self._seen or key in seen:
+                continue
+            seen[key] = log['blockNumber']
+            events.append(self.transfer_event.process_log(log))
+        self.chunk = min(self.max_chunk, self.chunk * 2)
+
+    def _finish(self, head, seen):
+        self._last_block = max(self._last_block, head)
+        self._window_scanned = True
+        self._seen.update(seen)
+        self._seen = {key: block for key, block in self._seen.items() if block > head - self.confirmations * 2}
+
+class PriceOracle:
+    """Prices SYPHER from the Uniswap V3 pools' slot0, reading both pools in one Multicall3 eth_call."""
+    POOL_ABI = [
+        {'inputs': [], 'name': 'slot0', 'outputs': [
+            {'name': 'sqrtPriceX96', 'type': 'uint160'}, {'name': 'tick', 'type': 'int24'},
+            {'name': 'observationIndex', 'type': 'uint16'}, {'name': 'observationCardinality', 'type': 'uint16'},
+            {'name': 'observationCardinalityNext', 'type': 'uint16'}, {'name': 'feeProtocol', 'type': 'uint8'},
+            {'name': 'unlocked', 'type': 'bool'}], 'stateMutability': 'view', 'type': 'function'},
+        {'inputs': [], 'name': 'token0', 'outputs': [{'name': '', 'type': 'address'}], 'stateMutability': 'view', 'type': 'function'},
+        {'inputs': [], 'name': 'token1', 'outputs': [{'name': '', 'type': 'address'}], 'stateMutability': 'view', 'type': 'function'},
+    ]
+    ERC20_ABI = [
+        {'inputs': [], 'name': 'decimals', 'outputs': [{'name': '', 'type': 'uint8'}], 'stateMutability': 'view', 'type': 'function'},
+    ]
+    MULTICALL_ABI = [
+        {'inputs': [{'components': [
+            {'name': 'target', 'type': 'address'}, {'name': 'allowFailure', 'type': 'bool'}, {'name': 'callData', 'type': 'bytes'}],
+            'name': 'calls', 'type': 'tuple[]'}],
+         'name': 'aggregate3',
+         'outputs': [{'components': [{'name': 'success', 'type': 'bool'}, {'name': 'returnData', 'type': 'bytes'}], 'name': 'returnData', 'type': 'tuple[]'}],
+         'stateMutability': 'payable', 'type': 'function'},
+    ]
+
+    def __init__(self, token_address, token_pool_address, usd_pool_address, multicall_address):
+        self.token_address = token_address
+        self.token_pool_address = token_pool_address
+        self.usd_pool_address = usd_pool_address
+        self.multicall_address = multicall_address
+        self._pools = None  # pool address -> (token0, token1, decimals0, decimals1), read once
+        print(f"Initialized PriceOracle with usd_pool={usd_pool_address}")
+
+    def _contract(self, address, abi):
+        w3 = web3.get()
+        return w3.eth.contract(address=w3.to_checksum_address(address), abi=abi)
+
+    @staticmethod
+    def _encode(contract, fn_name):
+        encode = getattr(contract, 'encode_abi', None) or getattr(contract, 'encodeABI')
+        return encode(fn_name)
+
+    def _multicall(self, calls):
+        """Run [(address, abi, fn_name, output types)] in one eth_call and decode each result."""
+        multicall = self._contract(self.multicall_address, self.MULTICALL_ABI)
+        w3 = web3.get()
+        requests_data = [(w3.to_checksum_address(address), False, self._encode(self._contract(address, abi), fn_name)) for address, abi, fn_name, _ in calls]
+        results = multicall.functions.aggregate3(requests_data).call()
+        return [w3.codec.decode(types, bytes(return_data)) for (_, _, _, types), (_, return_data) in zip(calls, results)]
+
+    def _load_pools(self):
+        tokens = [token[0] for token in self._multicall(self._token_calls())]
+        self._store_pools(tokens, self._multicall(self._decimals_calls(tokens)))
+
+    # Call lists and decoding shared with the asyncio oracle in async_bot.py
+    def _token_calls(self):
+        return [(pool, self.POOL_ABI, fn_name, ['address']) for pool in (self.token_pool_address, self.usd_pool_address) for fn_name in ('token0', 'token1')]
+
+    def _decimals_calls(self, tokens):
+        return [(token, self.ERC20_ABI, 'decimals', ['uint8']) for token in tokens]
+
+    def _slot0_calls(self):
+        return [(pool, self.POOL_ABI, 'slot0', ['uint160', 'int24', 'uint16', 'uint16', 'uint16', 'uint8', 'bool']) for pool in (self.token_pool_address, self.usd_pool_address)]
+
+    def _store_pools(self, tokens, decimals):
+        pools = [self.token_pool_address, self.usd_pool_address]
+        self._pools = {
+            pools[0]: (tokens[0], tokens[1], decimals[0][0], decimals[1][0]),
+            pools[1]: (tokens[2], tokens[3], decimals[2][0], decimals[3][0]),
+        }
+
+    @staticmethod
+    def _price_of_token0(sqrt_price_x96, decimals0, decimals1):
+        # slot0 holds sqrt(token1/token0) in raw units as a Q64.96 fixed point number
+        return (Decimal(sqrt_price_x96) / (2 ** 96)) ** 2 * Decimal(10) ** (decimals0 - decimals1)
+
+    def quote(self):
+        if self._pools is None:
+            self._load_pools()
+        return self._quote_from_slots(self._multicall(self._slot0_calls()))
+
+    def _quote_from_slots(self, slots):
+        token0, _, decimals0, decimals1 = self._pools[self.token_pool_address]
+        token_in_weth = self._price_of_token0(slots[0][0], decimals0, decimals1)
+        if token0.lower() != self.token_address.lower():
+            token_in_weth = 1 / token_in_weth
+
+        weth = self._pools[self.token_pool_address][1 if token0.lower() == self.token_address.lower() else 0]
+        usd_token0, _, usd_decimals0, usd_decimals1 = self._pools[self.usd_pool_address]
+        weth_in_usd = self._price_of_token0(slots[1][0], usd_decimals0, usd_decimals1)
+        if usd_token0.lower() != weth.lower():
+            weth_in_usd = 1 / weth_in_usd
+
+        return {
+            'token_in_weth': float(token_in_weth),
+            'weth_in_usd': float(weth_in_usd),
+            'token_in_usd': float(token_in_weth * weth_in_usd),
+        }
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+class HttpClient:
+    """Pooled HTTP sessions per upstream host with timeouts, jittered retries, circuit breakers and counters."""
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, connect_timeout, read_timeout, retries, failure_threshold, cooldown, pool_size=8):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.failure_threshold = failure_threshold  # Consecutive failures before the breaker opens
+        self.cooldown = cooldown  # Seconds an open breaker rejects calls before letting one through
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._upstreams = {}
+        print(f"Initialized HttpClient with timeout={self.timeout}, retries={retries}, failure_threshold={failure_threshold}, cooldown={cooldown}")
+
+    def _upstream(self, host):
+        with self._lock:
+            upstream = self._upstreams.get(host)
+            if upstream is None:
+                upstream = self._upstreams[host] = {
+                    'requests': 0, 'errors': 0, 'retries': 0, 'rejected': 0,
+                    'latency_total': 0.0, 'latency_max': 0.0,
+                    'consecutive_failures': 0, 'open_until': 0, 'last_error': None,
+                    'retry_after_until': 0,
+                }
+            return upstream
+
+    def _session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._sessions[host] = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+            return session
+
+    def _allow(self, upstream):
+        # An open breaker lets a single probe through once the cooldown has passed
+        with self._lock:
+            if time.time() < upstream['retry_after_until']:
+                # The upstream asked to be left alone until then
+                upstream['rejected'] += 1
+                return False
+            if upstream['consecutive_failures'] < self.failure_threshold:
+                return True
+            if time.time() >= upstream['open_until']:
+                upstream['open_until'] = time.time() + self.cooldown
+                return True
+            upstream['rejected'] += 1
+            return False
+
+    def _record(self, upstream, latency, error=None):
+        with self._lock:
+            upstream['requests'] += 1
+            upstream['latency_total'] += latency
+            upstream['latency_max'] = max(upstream['latency_max'], latency)
+            if error is None:
+                upstream['consecutive_failures'] = 0
+                return
+            upstream['errors'] += 1
+            upstream['last_error'] = error
+            upstream['consecutive_failures'] += 1
+            if upstream['consecutive_failures'] == self.failure_threshold:
+                upstream['open_until'] = time.time() + self.cooldown
+                print(f"Circuit opened for {error}")
+
+    def _retry_after(self, upstream, headers):
+        """Seconds a Retry-After header asks for, holding later calls off until then, or None without one."""
+        value = headers.get('Retry-After')
+        if value is None:
+            return None
+        try:
+            wait = float(value)
+        except ValueError:
+            try:
+                wait = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        wait = max(wait, 0)
+        with self._lock:
+            upstream['retry_after_until'] = max(upstream['retry_after_until'], time.time() + wait)
+        return wait
+
+    def _backoff(self, attempt, retry_after=None):
+        """Seconds to sleep before the next attempt, or None when Retry-After asks for longer than the backoff."""
+        backoff = 0.5 * 2 ** attempt
+        if retry_after is None:
+            return random.uniform(0, backoff)  # Full jitter backoff
+        return retry_after if retry_after <= backoff else None
+
+    def get(self, url, **kwargs):
+        host = urlparse(url).netloc
+        session, upstream = self._session(host), self._upstream(host)
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in itertools.count():
+            self._admit(host, upstream)
+            start = time.monotonic()
+            try:
+                response = session.get(url, **kwargs)
+            except requests.RequestException as e:
+                delay = self._failed(host, upstream, attempt, start, e)
+                if delay is None:
+                    raise
+            else:
+                delay = self._responded(host, upstream, attempt, start, response.status_code, response.headers)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+
+    # Attempt bookkeeping shared with AsyncHttpClient in async_bot.py
+    def _admit(self, host, upstream):
+        if not self._allow(upstream):
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+    def _failed(self, host, upstream, attempt, start, error):
+        """Record an attempt that raised, returning the backoff before the next one or None when it is the last."""
+        self._record(upstream, time.monotonic() - start, f"{host}: {type(error).__name__}")
+        if attempt >= self.retries:
+            return None
+        return self._retrying(upstream, self._backoff(attempt))
+
+    def _responded(self, host, upstream, attempt, start, status, headers):
+        """Record a response, returning the backoff before retrying it or None when it is the one to return."""
+        if status not in self.RETRY_STATUSES:
+            self._record(upstream, time.monotonic() - start)
+            return None
+        self._record(upstream, time.monotonic() - start, f"{host}: HTTP {status}")
+        delay = self._backoff(attempt, self._retry_after(upstream, headers))
+        if attempt >= self.retries or delay is None:
+            return None
+        return self._retrying(upstream, delay)
+
+    def _retrying(self, upstream, delay):
+        with self._lock:
+            upstream['retries'] += 1
+        return delay
+
+    def stats(self):
+        with self._lock:
+            return {host: dict(upstream) for host, upstream in self._upstreams.items()}
+
+class WarnCounter:
+    """Warn counts cached in process, persisted with atomic Firestore increments written behind."""
+    def __init__(self, collection, expiry):
+        self.collection = collection
+        self.expiry = expiry  # Seconds after the last warning before the count resets, 0 to never expire
+        self._lock = threading.Lock()
+        self._counts = {}  # user_id -> [warnings, last_warned]
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='warn-writer')
+        print(f"Initialized WarnCounter with expiry={expiry}")
+
+    def _load(self, user_id):
+        doc = firebase.get().collection(self.collection).document(str(user_id)).get()
         if doc.exists:
-            warnings = doc.to_dict()['warnings']
-            doc_ref.update({
-                'warnings': warnings + 1,
-            })
-            update.message.reply_text(f"{user_id} has been warned. Total warnings: {warnings + 1}")
-            check_warns(update, context, user_id)
-        else:
+            data = doc.to_dict()
+            return [data.get('warnings', 0), data.get('last_warned', 0)]
+        return [0, 0]
+
+    def _is_expired(self, entry, current_time):
+        return self.expiry and entry[0] and current_time - entry[1] > self.expiry
+
+    def get(self, user_id):
+        entry = self._counts.get(user_id)
+        if entry is None:
+            loaded = self._load(user_id)
+            with self._lock:
+                entry = self._counts.setdefault(user_id, loaded)
+        if self._is_expired(entry, time.time()):
+            return 0
+        return entry[0]
+
+    def add(self, user_id):
+        self.get(user_id)  # Make sure the stored count is cached before counting locally
+        current_time = time.time()
+        with self._lock:
+            entry = self._counts[user_id]
+            reset = self._is_expired(entry, current_time)
+            entry[0] = 1 if reset else entry[0] + 1
+            entry[1] = current_time
+            warnings = entry[0]
+
+        self._writer.submit(self._write, user_id, reset, current_time)
+        return warnings
+
+    def _write(self, user_id, reset, warned_at):
+        from firebase_admin import firestore
+
+        doc_ref = firebase.get().collection(self.collection).document(str(user_id))
+        try:
             doc_ref.set({
                 'id': user_id,
-                'warnings': 1,
-            })
-            update.message.reply_text(f"{user_id} has been warned. Total warnings: 1")
+                'warnings': 1 if reset else firestore.Increment(1),
+                'last_warned': warned_at,
+            }, merge=True)
+        except Exception as e:
+            print(f"Failed to persist warning for {user_id}: {e}")
+
+class ModerationVerdict:
+    DELETE = 'delete'
+    MUTE = 'mute'
+
+    __slots__ = ('action', 'reason', 'detail', 'delete')
+
+    def __init__(self, action=None, reason=None, detail=None, delete=None):
+        self.action = action
+        self.reason = reason
+        self.detail = detail
+        self.delete = action == self.DELETE if delete is None else delete  # A mute can carry a delete
+
+    def __bool__(self):
+        return self.action is not None
+
+    def __repr__(self):
+        return f"ModerationVerdict(action={self.action!r}, reason={self.reason!r}, detail={self.detail!r}, delete={self.delete!r})"
+
+class AdminCache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._admins = {}  # chat_id -> (expires_at, admin user ids)
+        print(f"Initialized AdminCache with ttl={ttl}")
+
+    def get(self, chat_id, fetch_admins):
+        admins = self.peek(chat_id)
+        if admins is None:
+            admins = self.put(chat_id, fetch_admins(chat_id))
+        return admins
+
+    def peek(self, chat_id):
+        """Return the cached admin ids, or None once they have expired."""
+        entry = self._admins.get(chat_id)
+        if entry is not None and time.time() < entry[0]:
+            return entry[1]
+        return None
 
-def check_warns(update, context, user_id):
-    doc_ref = db.collection('warns').document(str(user_id))
+    def put(self, chat_id, chat_admins):
+        admins = frozenset(admin.user.id for admin in chat_admins)
+        with self._lock:
+            self._admins[chat_id] = (time.time() + self.ttl, admins)
+        print(f"Refreshed admin list for chat {chat_id}: {len(admins)} admins")
+        return admins
+
+    def invalidate(self, chat_id):
+        with self._lock:
+            self._admins.pop(chat_id, None)
+
+class TokenBucket:
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period  # Tokens refilled per second
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def consume(self, tokens=1):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def refund(self, tokens=1):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def time_until_available(self, tokens=1):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                return 0
+            return (tokens - self.tokens) / self.rate
+
+    def is_full(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens >= self.capacity
+
+class CommandRateLimiter:
+    def __init__(self, global_limit, chat_limit, user_limit, period):
+        self.chat_limit = chat_limit
+        self.user_limit = user_limit
+        self.period = period
+        self.global_bucket = TokenBucket(global_limit, period)
+        self._lock = threading.Lock()
+        self._chat_buckets = {}
+        self._user_buckets = {}
+        print(f"Initialized CommandRateLimiter with global={global_limit}, chat={chat_limit}, user={user_limit} per {period}s")
+
+    def _bucket(self, buckets, key, limit):
+        with self._lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = TokenBucket(limit, self.period)
+            return bucket
+
+    def allow(self, chat_id, user_id):
+        # Charge the narrowest budget first and hand tokens back if a wider one is exhausted
+        charged = []
+        if user_id is not None:
+            charged.append(self._bucket(self._user_buckets, user_id, self.user_limit))
+        if chat_id is not None:
+            charged.append(self._bucket(self._chat_buckets, chat_id, self.chat_limit))
+        charged.append(self.global_bucket)
+
+        for index, bucket in enumerate(charged):
+            if not bucket.consume():
+                for consumed in charged[:index]:
+                    consumed.refund()
+                return False
+        return True
 
-    doc = doc_ref.get()
-    if doc.exists:
-        warnings = doc.to_dict()['warnings']
+    def evict_idle(self):
+        # Full buckets carry no state worth keeping
+        with self._lock:
+            evicted = 0
+            for buckets in (self._chat_buckets, self._user_buckets):
+                for key in [key for key, bucket in buckets.items() if bucket.is_full()]:
+                    del buckets[key]
+                    evicted += 1
+        return evicted
 
-        if warnings >= 3:
-            context.bot.kick_chat_member(update.message.chat.id, user_id)
-            update.message.reply_text(f"Goodbye {user_id}!")
-#endregion Database Slash Commands
+class SpamBucket:
+    __slots__ = ('tokens', 'last_seen', 'blocked_until')
 
-#endregion Firebase
+    def __init__(self, tokens, last_seen):
+        self.tokens = tokens
+        self.last_seen = last_seen
+        self.blocked_until = 0
 
-#region Classes
 class AntiSpam:
     def __init__(self, rate_limit, time_window, mute_time):
         self.rate_limit = rate_limit
         self.time_window = time_window
         self.mute_time = mute_time
-        self.user_messages = defaultdict(list)
-        self.blocked_users = defaultdict(lambda: 0)
+        self._lock = threading.Lock()
+        self._users = {}  # user_id -> SpamBucket, refilled at rate_limit tokens per time_window
         print(f"Initialized AntiSpam with rate_limit={rate_limit}, time_window={time_window}, mute_time={mute_time}")
 
     def is_spam(self, user_id):
         current_time = time.time()
-        if current_time < self.blocked_users[user_id]:
-            return True
-        self.user_messages[user_id] = [msg_time for msg_time in self.user_messages[user_id] if current_time - msg_time < self.time_window]
-        self.user_messages[user_id].append(current_time)
-        if len(self.user_messages[user_id]) > self.rate_limit:
-            self.blocked_users[user_id] = current_time + self.mute_time
-            return True
-        return False
+        with self._lock:
+            bucket = self._users.get(user_id)
+            if bucket is None:
+                bucket = self._users[user_id] = SpamBucket(self.rate_limit, current_time)
+
+            if current_time < bucket.blocked_until:
+                bucket.last_seen = current_time
+                return True
+
+            elapsed = current_time - bucket.last_seen
+            bucket.tokens = min(self.rate_limit, bucket.tokens + elapsed * self.rate_limit / self.time_window)
+            bucket.last_seen = current_time
+
+            if bucket.tokens < 1:
+                bucket.blocked_until = current_time + self.mute_time
+                return True
+            bucket.tokens -= 1
+            return False
 
     def time_to_wait(self, user_id):
         current_time = time.time()
-        if current_time < self.blocked_users[user_id]:
-            return int(self.blocked_users[user_id] - current_time)
+        bucket = self._users.get(user_id)
+        if bucket is not None and current_time < bucket.blocked_until:
+            return int(bucket.blocked_until - current_time)
         return 0
 
+    def evict_idle(self):
+        # A user idle for a full window has a full bucket again, so forgetting them changes nothing
+        current_time = time.time()
+        with self._lock:
+            idle_users = [
+                user_id for user_id, bucket in self._users.items()
+                if current_time - bucket.last_seen > self.time_window and current_time >= bucket.blocked_until
+            ]
+            for user_id in idle_users:
+                del self._users[user_id]
+        return len(idle_users)
+
+    def memory_footprint(self):
+        with self._lock:
+            buckets = list(self._users.values())
+            size = sys.getsizeof(self._users)
+        return size + sum(sys.getsizeof(bucket) for bucket in buckets)
+
+    def __len__(self):
+        return len(self._users)
+
 class AntiRaid:
     def __init__(self, user_amount, time_out, anti_raid_time):
         self.user_amount = user_amount
@@ -270,34 +1481,302 @@ class AntiRaid:
         if current_time < self.anti_raid_end_time:
             return int(self.anti_raid_end_time - current_time)
         return 0
+
+class HandlerPool:
+    """Worker pool for one concurrency class of handlers, so a slow class can never starve the others."""
+    def __init__(self, name, workers, queue_limit):
+        self.name = name
+        self.workers = workers
+        self.queue_limit = queue_limit  # Updates that may wait for a worker before new ones are shed
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{name}-handler')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.shed = 0
+        print(f"Initialized HandlerPool {name} with workers={workers}, queue_limit={queue_limit}")
+
+    def submit(self, callback, update, context):
+        """Queue a handler call, or return False when this class is at its limit."""
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self.shed += 1
+                return False
+            self._pending += 1
+        self._executor.submit(self._run, callback, update, context)
+        return True
+
+    def _run(self, callback, update, context):
+        try:
+            callback(update, context)
+        except Exception as e:
+            print(f"Error in {self.name} handler {callback.__name__}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self):
+        return {'busy': min(self._pending, self.workers), 'queued': max(self._pending - self.workers, 0), 'shed': self.shed}
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep Telegram's connections open between updates
+
+    def do_POST(self):
+        webhook = self.server.webhook
+        if self.path != webhook.url_path:
+            return self._respond(404, close=True)
+        # Constant-time compare, so the secret cannot be guessed byte by byte
+        if not hmac.compare_digest(self.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), webhook.secret_token):
+            webhook.count('rejected')
+            return self._respond(403, close=True)
+        if not webhook.connections.acquire(blocking=False):
+            webhook.count('busy')
+            return self._respond(503, close=True)  # Telegram retries the update later
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length > webhook.MAX_BODY:
+                return self._respond(413, close=True)
+            data = json.loads(self.rfile.read(length))
+            if not isinstance(data, dict):
+                raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+            update = Update.de_json(data, webhook.bot)
+            if update is None:
+                raise ValueError("empty update")
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            # Nested objects of the wrong JSON type fail inside de_json with any of these
+            webhook.count('errors')
+            print(f"Rejected malformed webhook update: {e}")
+            return self._respond(400)
+        else:
+            # Hand off and answer at once, the dispatcher does the work
+            webhook.update_queue.put(update)
+            webhook.count('received')
+            self._respond(200)
+        finally:
+            webhook.connections.release()
+
+    def _respond(self, status, close=False):
+        # Rejected bodies are never read, so their connection cannot be reused
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        if close:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass  # Every update would otherwise be logged to stderr
+
+class WebhookServer:
+    """Receives Telegram updates over HTTP(S) and hands them straight to the dispatcher's queue."""
+    MAX_BODY = 1 << 20  # Largest update body accepted, in bytes
+
+    def __init__(self, listen, port, url_path, secret_token, max_connections, cert=None, key=None):
+        self.listen = listen
+        self.port = port
+        self.url_path = url_path if url_path.startswith('/') else f'/{url_path}'
+        self.secret_token = secret_token
+        self.max_connections = max_connections
+        self.cert = cert
+        self.key = key
+        self.connections = threading.BoundedSemaphore(max_connections)
+        self.bot = None
+        self.update_queue = None
+        self._httpd = None
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        print(f"Initialized WebhookServer on {listen}:{port}{self.url_path} with max_connections={max_connections}, tls={bool(cert and key)}")
+
+    def start(self, bot, update_queue):
+        self.bot = bot
+        self.update_queue = update_queue
+        self._httpd = ThreadingHTTPServer((self.listen, self.port), WebhookRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.webhook = self
+        if self.cert and self.key:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(self.cert, self.key)
+            self._httpd.socket = context.wrap_socket(self._httpd.socket, server_side=True)
+        threading.Thread(target=self._httpd.serve_forever, name='webhook', daemon=True).start()
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
 #endregion Classes
 
+MAX_WARNINGS = 3  # Warnings before a user is kicked
+
+assets = AssetRegistry(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets'), 'assets')
+
+PRIORITY_MODERATION = 0  # Deletes and mutes go out first
+PRIORITY_BUY = 1  # Then buy alerts
+PRIORITY_CHAT = 2  # Then everything else
+PRIORITY_CLEANUP = 3  # /cleanbot deletes only go out when nothing else is waiting
+OUTBOUND_WAIT_TIMEOUT = 30  # Seconds a handler waits for a queued send
+CLEANUP_WAIT_TIMEOUT = 120  # Seconds /cleanbot waits for its deletes before reporting
+
+outbound = OutboundQueue(global_rate=30, chat_rate=20, chat_period=60)
+
+http_config = config.get('http', {})
+http = HttpClient(
+    connect_timeout=http_config.get('connectTimeout', 3.05),
+    read_timeout=http_config.get('readTimeout', 10),
+    retries=http_config.get('retries', 2),
+    failure_threshold=http_config.get('failureThreshold', 5),
+    cooldown=http_config.get('cooldown', 30)
+)
+
+price_oracle = PriceOracle(
+    token_address=contract_address,
+    token_pool_address=pool_address,
+    usd_pool_address=config.get('wethUsdPoolAddress', '0xd0b53D9277642d899DF5C87A3966A349A798F224'),
+    multicall_address=config.get('multicallAddress', '0xcA11bde05977b3631167028862bE2a173976CA11')
+)
+ORACLE_TTL = 10  # Seconds an on-chain quote is reused
+
+market_data = MarketDataCache(ttl=config.get('marketDataTtl', 30), stale_ttl=config.get('marketDataStaleTtl', 300))
+
+chart_cache = ChartCache(max_entries=16)
+chart_renderer = ChartRenderer(workers=2, max_pending=8)
+CHART_RENDER_TIMEOUT = 60  # Seconds to wait for a render before giving up
+CHART_CAPTION = '\n[Dexscreener](https://dexscreener.com/base/0xb0fbaa5c7d28b33ac18d9861d4909396c1b8029b) • [Dextools](https://www.dextools.io/app/en/base/pair-explorer/0xb0fbaa5c7d28b33ac18d9861d4909396c1b8029b?t=1715831623074) • [CMC](https://coinmarketcap.com/dexscan/base/0xb0fbaa5c7d28b33ac18d9861d4909396c1b8029b/) • [CG](https://www.geckoterminal.com/base/pools/0xb0fbaa5c7d28b33ac18d9861d4909396c1b8029b?utm_source=coingecko)\n'
+MAX_CHART_CANDLES = 500  # Most candles /chart will draw
+INVALID_CHART_MESSAGE = f'Invalid chart specified. Please use /chart with m, h or d, or an interval and range like /chart 4h 7d (up to {MAX_CHART_CANDLES} candles), optionally followed by sma, ema, vwap or bands.'
+CHART_BUSY_MESSAGE = 'Too many charts are being drawn right now. Please try again shortly.'
+CHART_FAILED_MESSAGE = 'Failed to fetch data or generate chart. Please try again later.'
+PRICE_CURRENCIES = ['usd', 'eur', 'jpy', 'gbp', 'aud', 'cad', 'mxn']
+UNSUPPORTED_CURRENCY_MESSAGE = "Unsupported currency. Please use 'usd', 'eur'. 'jpy', 'gbp', 'aud', 'cad' or 'mxn'."
+chart_overlay_pattern = re.compile(r'(sma|ema)(\d+)?|(vwap|bands)')
+
+candle_store = CandleStore(config.get('candleStorePath', 'candles.db'))
+CANDLE_PAGE_SIZE = 1000  # Most minute candles GeckoTerminal returns per request
+CANDLE_BACKFILL_PAGES = 11  # Just over a week of minute candles on first sync
+
+TRACKED_MESSAGES_PER_CHAT = 500  # Oldest tracked bot messages are forgotten past this
+DELETE_WINDOW = 48 * 60 * 60  # Telegram only lets bots delete messages for 48 hours
+BULK_DELETE_SIZE = 100  # Maximum message ids per deleteMessages call
+
+phrase_filter = PhraseFilter()
+warn_counter = WarnCounter('warns', expiry=config.get('warnExpiry', 0))
+admin_cache = AdminCache(ttl=config.get('adminCacheTtl', 300))
 anti_spam = AntiSpam(rate_limit=5, time_window=10, mute_time=60)
 anti_raid = AntiRaid(user_amount=25, time_out=30, anti_raid_time=180)
 
-RATE_LIMIT = 100  # Maximum number of allowed commands
+RATE_LIMIT = 100  # Maximum number of allowed commands across the bot
+CHAT_RATE_LIMIT = 30  # Maximum number of allowed commands per chat
+USER_RATE_LIMIT = 5  # Maximum number of allowed commands per user
 TIME_PERIOD = 60  # Time period in seconds
-last_check_time = time.time()
-command_count = 0
+
+command_limiter = CommandRateLimiter(RATE_LIMIT, CHAT_RATE_LIMIT, USER_RATE_LIMIT, TIME_PERIOD)
+
+# Each handler runs on its concurrency class's own workers, so heavy commands never hold up moderation
+handler_concurrency = {
+    'moderation': {'workers': 4, 'queueLimit': 1000},
+    'commands': {'workers': 4, 'queueLimit': 100},
+    'games': {'workers': 2, 'queueLimit': 100},
+    'heavy': {'workers': 2, 'queueLimit': 10},
+}
+for handler_class, limits in config.get('handlerConcurrency', {}).items():
+    handler_concurrency[handler_class] = {**handler_concurrency.get(handler_class, {}), **limits}
+handler_pools = {
+    handler_class: HandlerPool(handler_class, limits['workers'], limits['queueLimit'])
+    for handler_class, limits in handler_concurrency.items()
+}
 
 user_verification_progress = {}
 
-bot_messages = []
+bot_messages = MessageTracker(max_per_chat=TRACKED_MESSAGES_PER_CHAT, max_age=DELETE_WINDOW)
 
 def track_message(message):
-    bot_messages.append((message.chat.id, message.message_id))
+    bot_messages.track(message.chat.id, message.message_id)
     print(f"Tracked message: {message.message_id}")
 
+def on_sent(future, callback):
+    """Call callback with the sent message once a queued send succeeds."""
+    def on_done(done):
+        if not done.cancelled() and done.exception() is None and done.result() is not None:
+            callback(done.result())
+    future.add_done_callback(on_done)
+
+def track_when_sent(future):
+    on_sent(future, track_message)
+
+def dispatch(priority, chat_id, func, /, *args, wait=True, **kwargs):
+    """Queue a Telegram call on the outbound queue, returning its result or, with wait=False, its future."""
+    future = outbound.submit(priority, chat_id, func, *args, **kwargs)
+    if not wait:
+        return future
+    try:
+        return future.result(timeout=OUTBOUND_WAIT_TIMEOUT)
+    except FutureTimeoutError:
+        # Withdraw it if it has not gone out yet, so the caller's failure is not followed by a late send
+        future.cancel()
+        raise
+
+def reply(update, *args, priority=PRIORITY_CHAT, wait=True, **kwargs):
+    return dispatch(priority, update.effective_chat.id, update.message.reply_text, *args, wait=wait, **kwargs)
+
+def send_message(bot, chat_id, *args, priority=PRIORITY_CHAT, wait=True, **kwargs):
+    return dispatch(priority, chat_id, bot.send_message, chat_id, *args, wait=wait, **kwargs)
+
+def answer(query):
+    # Clears the button's loading state, ahead of chat traffic and outside the chat's budget
+    return dispatch(PRIORITY_MODERATION, None, query.answer, wait=False)
+
+def sending_permissions(allowed):
+    """ChatPermissions to send messages and media, for python-telegram-bot 13 and 20+ alike."""
+    permissions = dict(can_send_messages=allowed, can_send_other_messages=allowed, can_send_videos=allowed, can_send_photos=allowed, can_send_audios=allowed)
+    if Filters is not None:
+        permissions['can_send_media_messages'] = allowed  # 20+ replaced it with the per-type permissions
+    return ChatPermissions(**permissions)
+
+def pooled(handler_class, callback):
+    """Wrap a handler so the dispatcher hands it to its class's pool and moves on to the next update."""
+    pool = handler_pools[handler_class]
+
+    def run(update, context):
+        if pool.submit(callback, update, context):
+            return
+        if handler_class == 'moderation':
+            # Moderation is never shed, it runs on the dispatcher thread instead
+            callback(update, context)
+            return
+        print(f"{handler_class} handlers at their limit, shed {callback.__name__}")
+        if handler_class in ('commands', 'heavy') and update.message is not None:
+            track_when_sent(reply(update, "The bot is busy right now, please try again shortly.", wait=False))
+
+    return run
+
+def warming_up(update, *resources):
+    """Tell the user a command's subsystems are not up yet, returning True when it should not run."""
+    pending = [resource for resource in resources if not resource.is_ready()]
+    if not pending:
+        return False
+
+    if any(resource.state == LazyResource.DEGRADED for resource in pending):
+        msg = reply(update, "This command is temporarily unavailable, please try again later.")
+    else:
+        msg = reply(update, "The bot is still warming up, please try again in a moment.")
+    if msg is not None:
+        track_message(msg)
+    return True
+
 #region Main Slash Commands
 def start(update: Update, context: CallbackContext) -> None:
-    if rate_limit_check():
-        update.message.reply_text('Hello! I am Sypher Bot. For a list of commands, please use /help.')
-    else:
-        update.message.reply_text('Bot rate limit exceeded. Please try again later.')
+    if rate_limit_check(update):
+        reply(update, 'Hello! I am Sypher Bot. For a list of commands, please use /help.')
 
 def help(update: Update, context: CallbackContext) -> None:
     msg = None
-    if rate_limit_check():
+    if rate_limit_check(update):
         keyboard = [
             [InlineKeyboardButton("/play", callback_data='help_play'),
             InlineKeyboardButton("/endgame", callback_data='help_endgame')],
@@ -310,25 +1789,29 @@ def help(update: Update, context: CallbackContext) -> None:
             InlineKeyboardButton("/chart", callback_data='help_chart')],
             [InlineKeyboardButton("/contract", callback_data='help_contract'),
             InlineKeyboardButton("/liquidity", callback_data='help_liquidity'),
-            InlineKeyboardButton("/volume", callback_data='help_volume')],
+            InlineKeyboardButton("/volume", callback_data='help_volume'),
+            InlineKeyboardButton("/stats", callback_data='help_stats')],
             [InlineKeyboardButton("/whitepaper", callback_data='help_whitepaper'),]
         ]
 
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        msg = update.message.reply_text('Welcome to Sypher Bot! Below you will find all my commands:', reply_markup=reply_markup)
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
+        msg = reply(update, 'Welcome to Sypher Bot! Below you will find all my commands:', reply_markup=reply_markup)
     
     if msg is not None:
         track_message(msg)
 
 def help_buttons(update: Update, context: CallbackContext) -> None:
     query = update.callback_query
-    query.answer()
+    answer(query)
+
+    # The replayed command below runs as the bot's own message, so the presser is charged here
+    if not rate_limit_check(update):
+        return
 
     update = Update(update.update_id, message=query.message)
 
+    # Market data and chart replays go to the heavy pool like their commands, off the commands pool
     if query.data == 'help_play':
         play(update, context)
     elif query.data == 'help_endgame':
@@ -348,27 +1831,24 @@ def help_buttons(update: Update, context: CallbackContext) -> None:
     elif query.data == 'help_website':
         website(update, context)
     elif query.data == 'help_price':
-        price(update, context)
+        pooled('heavy', price)(update, context)
     elif query.data == 'help_chart':
-        chart(update, context)
+        pooled('heavy', chart)(update, context)
     elif query.data == 'help_liquidity':
-        liquidity(update, context)
+        pooled('heavy', liquidity)(update, context)
     elif query.data == 'help_volume':
-        volume(update, context)
+        pooled('heavy', volume)(update, context)
+    elif query.data == 'help_stats':
+        pooled('heavy', stats)(update, context)
 
 #region Play Game
 def play(update: Update, context: CallbackContext) -> None:
-    if rate_limit_check():
+    if rate_limit_check(update):
         keyboard = [[InlineKeyboardButton("Click Here to Start a Game!", callback_data='startGame')]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        base_dir = os.path.dirname(__file__)
-        photo_path = os.path.join(base_dir, 'assets', 'banner.gif')
-        
-        with open(photo_path, 'rb') as photo:
-            context.bot.send_photo(chat_id=update.effective_chat.id, photo=photo, caption='Welcome to deSypher! Click the button below to start a game!', reply_markup=reply_markup)
-    else:
-        update.message.reply_text('Bot rate limit exceeded. Please try again later.')
+        # The banner is uploaded once, then resent by file_id
+        assets.send(context.bot, update.effective_chat.id, 'banner.gif', 'photo', caption='Welcome to deSypher! Click the button below to start a game!', reply_markup=reply_markup)
 
 def end_game(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
@@ -379,17 +1859,17 @@ def end_game(update: Update, context: CallbackContext) -> None:
     if key in context.chat_data:
         # Delete the game message
         if 'game_message_id' in context.chat_data[key]:
-            context.bot.delete_message(chat_id=chat_id, message_id=context.chat_data[key]['game_message_id'])
+            dispatch(PRIORITY_MODERATION, chat_id, context.bot.delete_message, chat_id=chat_id, message_id=context.chat_data[key]['game_message_id'])
 
         # Clear the game data
         del context.chat_data[key]
-        update.message.reply_text("Your game has been deleted.")
+        reply(update, "Your game has been deleted.")
     else:
-        update.message.reply_text("You don't have an ongoing game.")
+        reply(update, "You don't have an ongoing game.")
 
 def handle_start_game(update: Update, context: CallbackContext) -> None:
     query = update.callback_query
-    query.answer()
+    answer(query)
     if query.data == 'startGame':
         user_id = query.from_user.id
         first_name = query.from_user.first_name  # Get the user's first name
@@ -399,9 +1879,9 @@ def handle_start_game(update: Update, context: CallbackContext) -> None:
         # Check if the user already has an ongoing game
         if key in context.chat_data:
             # Delete the old message
-            context.bot.delete_message(chat_id=chat_id, message_id=query.message.message_id)
+            dispatch(PRIORITY_MODERATION, chat_id, context.bot.delete_message, chat_id=chat_id, message_id=query.message.message_id)
             # Send a new message
-            context.bot.send_message(chat_id=chat_id, text="You already have an active game. Please use the command */endgame* to end your previous game before starting a new one!", parse_mode='Markdown')
+            send_message(context.bot, chat_id=chat_id, text="You already have an active game. Please use the command */endgame* to end your previous game before starting a new one!", parse_mode='Markdown')
             return
 
         word = fetch_random_word()
@@ -422,13 +1902,16 @@ def handle_start_game(update: Update, context: CallbackContext) -> None:
         game_layout = "\n".join([row_template for _ in range(num_rows)])
         
         # Delete the old message
-        context.bot.delete_message(chat_id=chat_id, message_id=query.message.message_id)
+        dispatch(PRIORITY_MODERATION, chat_id, context.bot.delete_message, chat_id=chat_id, message_id=query.message.message_id)
 
-        # Send a new message with the game layout and store the message ID
-        game_message = context.bot.send_message(chat_id=chat_id, text=f"*{first_name}'s Game*\nPlease guess a five letter word!\n\n{game_layout}", parse_mode='Markdown')
-        context.chat_data[key]['game_message_id'] = game_message.message_id
-        
-        print(f"Game started for {first_name} in {chat_id} with message ID {game_message.message_id}")
+        # Send a new message with the game layout and store its ID once it is out, however long the chat's queue is
+        game = context.chat_data[key]
+
+        def game_sent(game_message):
+            game['game_message_id'] = game_message.message_id
+            print(f"Game started for {first_name} in {chat_id} with message ID {game_message.message_id}")
+
+        on_sent(send_message(context.bot, chat_id=chat_id, text=f"*{first_name}'s Game*\nPlease guess a five letter word!\n\n{game_layout}", parse_mode='Markdown', wait=False), game_sent)
 
 def handle_guess(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
@@ -453,7 +1936,7 @@ def handle_guess(update: Update, context: CallbackContext) -> None:
     # Check if the guess is not 5 letters and the user has an active game
     if len(user_guess) != 5 or not user_guess.isalpha():
         print(f"Invalid guess length: {len(user_guess)}")
-        msg = update.message.reply_text("Please guess a five letter word containing only letters!")
+        msg = reply(update, "Please guess a five letter word containing only letters!")
         return
 
     if 'guesses' not in context.chat_data[key]:
@@ -485,7 +1968,7 @@ def handle_guess(update: Update, context: CallbackContext) -> None:
     # Delete the previous game message
     if 'game_message_id' in context.chat_data[key]:
         try:
-            context.bot.delete_message(chat_id=chat_id, message_id=context.chat_data[key]['game_message_id'])
+            dispatch(PRIORITY_MODERATION, chat_id, context.bot.delete_message, chat_id=chat_id, message_id=context.chat_data[key]['game_message_id'])
         except telegram.error.BadRequest:
             print("Message to delete not found")
 
@@ -494,36 +1977,37 @@ def handle_guess(update: Update, context: CallbackContext) -> None:
 
     # Check if it's not the 4th guess and the user hasn't guessed the word correctly before sending the game message
     if len(context.chat_data[key]['guesses']) < 4 and user_guess != chosen_word:
-        game_message = context.bot.send_message(chat_id=chat_id, text=f"*{player_name}'s Game*\nPlease guess a five letter word!\n\n{game_layout}", parse_mode='Markdown')
+        game = context.chat_data[key]
+        game_message = send_message(context.bot, chat_id=chat_id, text=f"*{player_name}'s Game*\nPlease guess a five letter word!\n\n{game_layout}", parse_mode='Markdown', wait=False)
     
-        # Store the new message ID
-        context.chat_data[key]['game_message_id'] = game_message.message_id
+        # Store the new message ID once it is out
+        on_sent(game_message, lambda sent: game.update(game_message_id=sent.message_id))
 
     # Check if the user has guessed the word correctly
     if user_guess == chosen_word:
         # Delete the previous game message
         if 'game_message_id' in context.chat_data[key]:
             try:
-                context.bot.delete_message(chat_id=chat_id, message_id=context.chat_data[key]['game_message_id'])
+                dispatch(PRIORITY_MODERATION, chat_id, context.bot.delete_message, chat_id=chat_id, message_id=context.chat_data[key]['game_message_id'])
             except telegram.error.BadRequest:
                 print("Message to delete not found")
 
         # Update the game layout
         game_layout = get_game_layout(context.chat_data[key]['guesses'], chosen_word)
-        game_message = context.bot.send_message(chat_id=chat_id, text=f"*{player_name}'s Final Results:*\n\n{game_layout}\n\nCongratulations! You've guessed the word correctly!\n\nIf you enjoyed this, you can play the game with SYPHER tokens on the [website](https://desypher.net/).", parse_mode='Markdown')
+        game_message = send_message(context.bot, chat_id=chat_id, text=f"*{player_name}'s Final Results:*\n\n{game_layout}\n\nCongratulations! You've guessed the word correctly!\n\nIf you enjoyed this, you can play the game with SYPHER tokens on the [website](https://desypher.net/).", parse_mode='Markdown', wait=False)
         print("User guessed the word correctly. Clearing game data.")
         del context.chat_data[key]
     elif len(context.chat_data[key]['guesses']) >= 4:
         # Delete the previous game message
         if 'game_message_id' in context.chat_data[key]:
             try:
-                context.bot.delete_message(chat_id=chat_id, message_id=context.chat_data[key]['game_message_id'])
+                dispatch(PRIORITY_MODERATION, chat_id, context.bot.delete_message, chat_id=chat_id, message_id=context.chat_data[key]['game_message_id'])
             except telegram.error.BadRequest:
                 print("Message to delete not found")
 
         # Update the game layout
         game_layout = get_game_layout(context.chat_data[key]['guesses'], chosen_word)
-        game_message = context.bot.send_message(chat_id=chat_id, text=f"*{player_name}'s Final Results:*\n\n{game_layout}\n\nGame over! The correct word was: {chosen_word}\n\nTry again on the [website](https://desypher.net/), you'll probably have a better time playing with SYPHER tokens.", parse_mode='Markdown')
+        game_message = send_message(context.bot, chat_id=chat_id, text=f"*{player_name}'s Final Results:*\n\n{game_layout}\n\nGame over! The correct word was: {chosen_word}\n\nTry again on the [website](https://desypher.net/), you'll probably have a better time playing with SYPHER tokens.", parse_mode='Markdown', wait=False)
 
         print(f"Game over. User failed to guess the word {chosen_word}. Clearing game data.")
         del context.chat_data[key]
@@ -539,8 +2023,8 @@ def fetch_random_word() -> str:
 
 def tukyo(update: Update, context: CallbackContext) -> None:
     msg = None
-    if rate_limit_check():
-        msg = update.message.reply_text(
+    if rate_limit_check(update):
+        msg = reply(update, 
             'Tukyo is the developer of this bot, deSypher and other projects. There are many impersonators, the only real Tukyo on telegram is @tukyowave.\n'
             '\n'
             '| Socials |\n'
@@ -553,16 +2037,14 @@ def tukyo(update: Update, context: CallbackContext) -> None:
             'Bandcamp: https://tukyo.bandcamp.com/\n'
             'Github: https://github.com/tukyo\n'
         )
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
     
     if msg is not None:
         track_message(msg)
 
 def tukyogames(update: Update, context: CallbackContext) -> None:
     msg = None
-    if rate_limit_check():
-        msg = update.message.reply_text(
+    if rate_limit_check(update):
+        msg = reply(update, 
             'Tukyo Games is a game development studio that is focused on bringing innovative blockchain technology to captivating and new game ideas. We use blockchain technology, without hindering the gaming experience.\n'
             '\n'
             'Website: https://tukyogames.com/ (Coming Soon)\n'
@@ -572,30 +2054,26 @@ def tukyogames(update: Update, context: CallbackContext) -> None:
             'Super G.I.M.P. Girl: https://superhobogimpgirl.com/\n'
             'Profectio: https://www.tukyowave.com/projects/profectio\n'
         )
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
     
     if msg is not None:
         track_message(msg)
 
 def deSypher(update: Update, context: CallbackContext) -> None:
     msg = None
-    if rate_limit_check():
-        msg = update.message.reply_text(
+    if rate_limit_check(update):
+        msg = reply(update, 
             'deSypher is an Onchain puzzle game that can be played on Base. It is a game that requires SYPHER to play. The goal of the game is to guess the correct word in four attempts. Guess the correct word, or go broke!\n'
             '\n'
             'Website: https://desypher.net/\n'
         )
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
     
     if msg is not None:
         track_message(msg)
 
 def sypher(update: Update, context: CallbackContext) -> None:
     msg = None
-    if rate_limit_check():
-        msg = update.message.reply_text(
+    if rate_limit_check(update):
+        msg = reply(update, 
             'SYPHER is the native token of deSypher. It is used to play the game, and can be earned by playing the game.\n'
             '\n'
             'Get SYPHER: [Uniswap](https://app.uniswap.org/#/swap?outputCurrency=0x21b9D428EB20FA075A29d51813E57BAb85406620)\n'
@@ -608,42 +2086,36 @@ def sypher(update: Update, context: CallbackContext) -> None:
             parse_mode='Markdown',
             disable_web_page_preview=True
         )
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
     
     if msg is not None:
         track_message(msg)
 
 def ca(update: Update, context: CallbackContext) -> None:
     msg = None
-    if rate_limit_check():
-        msg = update.message.reply_text(
+    if rate_limit_check(update):
+        msg = reply(update, 
             '0x21b9D428EB20FA075A29d51813E57BAb85406620\n'
         )
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
     
     if msg is not None:
         track_message(msg)
 
 def whitepaper(update: Update, context: CallbackContext) -> None:
-    if rate_limit_check():
-        msg = update.message.reply_text(
+    msg = None
+    if rate_limit_check(update):
+        msg = reply(update, 
         'https://desypher.net/whitepaper.html\n'
         )
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
     
-    track_message(msg)
+    if msg is not None:
+        track_message(msg)
 
 def website(update: Update, context: CallbackContext) -> None:
     msg = None
-    if rate_limit_check():
-        msg = update.message.reply_text(
+    if rate_limit_check(update):
+        msg = reply(update, 
             'https://desypher.net/\n'
         )
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
     
     if msg is not None:
         track_message(msg)
@@ -665,30 +2137,30 @@ def report(update: Update, context: CallbackContext) -> None:
     if chat_id == CHAT_ID:
         if reported_user in admins:
             # If the reported user is an admin, send a message saying that admins cannot be reported
-            context.bot.send_message(CHAT_ID, text="Nice try lol")
+            send_message(context.bot, CHAT_ID, text="Nice try lol")
         else:
             admin_mentions = ' '.join(admins)
 
             report_message = f"Reported Message to admins.\n {admin_mentions}\n"
             # Send the message as plain text
-            message = context.bot.send_message(CHAT_ID, text=report_message, disable_web_page_preview=True)
+            message = send_message(context.bot, CHAT_ID, text=report_message, disable_web_page_preview=True)
 
             # Immediately edit the message to remove the usernames, using Markdown for the new message
-            context.bot.edit_message_text(chat_id=CHAT_ID, message_id=message.message_id, text="⚠️ Message Reported to Admins ⚠️", parse_mode='Markdown', disable_web_page_preview=True)
+            dispatch(PRIORITY_CHAT, CHAT_ID, context.bot.edit_message_text, chat_id=CHAT_ID, message_id=message.message_id, text="⚠️ Message Reported to Admins ⚠️", parse_mode='Markdown', disable_web_page_preview=True)
     else:
-        update.message.reply_text("This command can only be used in the main chat.")
+        reply(update, "This command can only be used in the main chat.")
 
 def save(update: Update, context: CallbackContext):
     msg = None
-    if rate_limit_check():
+    if rate_limit_check(update):
         target_message = update.message.reply_to_message
         if target_message is None:
-            msg = update.message.reply_text("Please reply to the message you want to save with /save.")
+            msg = reply(update, "Please reply to the message you want to save with /save.")
             return
 
         user = update.effective_user
         if user is None:
-            msg = update.message.reply_text("Could not identify the user.")
+            msg = reply(update, "Could not identify the user.")
             return
 
         # Determine the type of the message
@@ -728,27 +2200,25 @@ def save(update: Update, context: CallbackContext):
             content = target_message.location
             content_type = 'location'
         else:
-            msg = update.message.reply_text("The message format is not supported.")
+            msg = reply(update, "The message format is not supported.")
             return
 
         # Send the message or media to the user's DM
         try:
             if content_type == 'text':
-                context.bot.send_message(chat_id=user.id, text=content)
+                send_message(context.bot, chat_id=user.id, text=content)
             elif content_type in ['photo', 'audio', 'document', 'animation', 'video', 'voice', 'video_note', 'sticker']:
                 send_function = getattr(context.bot, f'send_{content_type}')
-                send_function(chat_id=user.id, **{content_type: content})
+                dispatch(PRIORITY_CHAT, user.id, send_function, chat_id=user.id, **{content_type: content})
             elif content_type == 'contact':
-                context.bot.send_contact(chat_id=user.id, phone_number=content.phone_number, first_name=content.first_name, last_name=content.last_name)
+                dispatch(PRIORITY_CHAT, user.id, context.bot.send_contact, chat_id=user.id, phone_number=content.phone_number, first_name=content.first_name, last_name=content.last_name)
             elif content_type == 'location':
-                context.bot.send_location(chat_id=user.id, latitude=content.latitude, longitude=content.longitude)
+                dispatch(PRIORITY_CHAT, user.id, context.bot.send_location, chat_id=user.id, latitude=content.latitude, longitude=content.longitude)
             
 
-            msg = update.message.reply_text("Check your DMs.")
+            msg = reply(update, "Check your DMs.")
         except Exception as e:
-            msg = update.message.reply_text(f"Failed to send DM: {str(e)}")
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
+            msg = reply(update, f"Failed to send DM: {str(e)}")
 
     if msg is not None:
         track_message(msg)
@@ -756,33 +2226,40 @@ def save(update: Update, context: CallbackContext):
 
 #region Ethereum Logic
 def get_token_price_in_weth(contract_address):
+    return market_data.get(('token_price_in_weth', contract_address), lambda: fetch_token_price_in_weth(contract_address))
+
+def get_weth_price_in_fiat(currency):
+    return market_data.get(('weth_price_in_fiat', currency), lambda: fetch_weth_price_in_fiat(currency))
+
+def fetch_token_price_in_weth(contract_address):
     apiUrl = f"https://api.dexscreener.com/latest/dex/tokens/{contract_address}"
     try:
-        response = requests.get(apiUrl)
+        response = http.get(apiUrl)
         response.raise_for_status()
-        data = response.json()
-        
-        if data['pairs'] and len(data['pairs']) > 0:
-            # Find the pair with WETH as the quote token
-            weth_pair = next((pair for pair in data['pairs'] if pair['quoteToken']['symbol'] == 'WETH'), None)
-            
-            if weth_pair:
-                price_in_weth = weth_pair['priceNative']
-                return price_in_weth
-            else:
-                print("No WETH pair found for this token.")
-                return None
-        else:
-            print("No pairs found for this token.")
-            return None
+        return parse_token_price_in_weth(response.json())
     except requests.RequestException as e:
         print(f"Error fetching token price from DexScreener: {e}")
         return None
     
-def get_weth_price_in_fiat(currency):
+def parse_token_price_in_weth(data):
+    if data['pairs'] and len(data['pairs']) > 0:
+        # Find the pair with WETH as the quote token
+        weth_pair = next((pair for pair in data['pairs'] if pair['quoteToken']['symbol'] == 'WETH'), None)
+        
+        if weth_pair:
+            price_in_weth = weth_pair['priceNative']
+            return price_in_weth
+        else:
+            print("No WETH pair found for this token.")
+            return None
+    else:
+        print("No pairs found for this token.")
+        return None
+
+def fetch_weth_price_in_fiat(currency):
     apiUrl = f"https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies={currency}"
     try:
-        response = requests.get(apiUrl)
+        response = http.get(apiUrl)
         response.raise_for_status()  # This will raise an exception for HTTP errors
         data = response.json()
         return data['ethereum'][currency]
@@ -790,49 +2267,71 @@ def get_weth_price_in_fiat(currency):
         print(f"Error fetching WETH price from CoinGecko: {e}")
         return None
     
+def get_onchain_quote():
+    if not web3.is_ready():
+        return None  # DexScreener prices until the RPC is up
+    return market_data.get('onchain_quote', price_oracle.quote, ttl=ORACLE_TTL)
+
 def get_token_price_in_fiat(contract_address, currency):
-    # Fetch price of token in WETH
-    token_price_in_weth = get_token_price_in_weth(contract_address)
+    # Read the pools on-chain first, falling back to DexScreener
+    quote = get_onchain_quote() if contract_address.lower() == config['contractAddress'].lower() else None
+    if quote is not None and currency == 'usd':
+        return quote['token_in_usd']
+
+    # Fetch price of token in WETH, then of WETH in the specified currency
+    token_price_in_weth = quote['token_in_weth'] if quote is not None else get_token_price_in_weth(contract_address)
+    weth_price_in_fiat = get_weth_price_in_fiat(currency) if token_price_in_weth is not None else None
+    return combine_token_price(token_price_in_weth, weth_price_in_fiat, currency)
+
+def combine_token_price(token_price_in_weth, weth_price_in_fiat, currency):
+    # Shared with the asyncio runtime, which awaits the same lookups
     if token_price_in_weth is None:
         print("Could not retrieve token price in WETH.")
         return None
-
-    # Fetch price of WETH in the specified currency
-    weth_price_in_fiat = get_weth_price_in_fiat(currency)
     if weth_price_in_fiat is None:
         print(f"Could not retrieve WETH price in {currency}.")
         return None
 
     # Calculate token price in the specified currency
-    token_price_in_fiat = float(token_price_in_weth) * weth_price_in_fiat
-    return token_price_in_fiat
+    return float(token_price_in_weth) * weth_price_in_fiat
 
-def get_liquidity():
+def get_pool_snapshot():
+    return market_data.get('pool_snapshot', fetch_pool_snapshot)
+
+def fetch_pool_snapshot():
     try:
-        response = requests.get("https://api.geckoterminal.com/api/v2/networks/base/pools/0xB0fbaa5c7D28B33Ac18D9861D4909396c1B8029b")
+        response = http.get(f"https://api.geckoterminal.com/api/v2/networks/base/pools/{pool_address}")
         response.raise_for_status()
-        data = response.json()
-        # Navigate the JSON to find the liquidity in USD
-        liquidity_usd = data['data']['attributes']['reserve_in_usd']
-        return liquidity_usd
-    except requests.RequestException as e:
-        print(f"Failed to fetch liquidity data: {str(e)}")
+        return parse_pool_snapshot(response.json())
+    except (requests.RequestException, KeyError, ValueError) as e:
+        print(f"Failed to fetch pool data: {str(e)}")
+        return None
+
+def parse_pool_snapshot(data):
+    attributes = data['data']['attributes']
+    # Parse everything the pool commands need from the one response
+    return {
+        'price_usd': attributes.get('base_token_price_usd'),
+        'reserve_usd': attributes.get('reserve_in_usd'),
+        'volume_usd': attributes.get('volume_usd', {}),
+        'price_change': attributes.get('price_change_percentage', {}),
+        'transactions': attributes.get('transactions', {}),
+    }
+
+def get_liquidity():
+    snapshot = get_pool_snapshot()
+    if snapshot is None:
         return None
+    return snapshot['reserve_usd']
 
 def get_volume():
-    try:
-        response = requests.get("https://api.geckoterminal.com/api/v2/networks/base/pools/0xB0fbaa5c7D28B33Ac18D9861D4909396c1B8029b")
-        response.raise_for_status()
-        data = response.json()
-        # Navigate the JSON to find the 24-hour volume in USD
-        volume_24h_usd = data['data']['attributes']['volume_usd']['h24']
-        return volume_24h_usd
-    except requests.RequestException as e:
-        print(f"Failed to fetch volume data: {str(e)}")
+    snapshot = get_pool_snapshot()
+    if snapshot is None:
         return None
+    return snapshot['volume_usd'].get('h24')
 
 #region Chart
-def fetch_ohlcv_data(time_frame):
+def ohlcv_request(time_frame):
     now = datetime.now()
     one_hour_ago = now - timedelta(hours=1)
     start_of_hour_timestamp = int(one_hour_ago.timestamp())
@@ -844,90 +2343,314 @@ def fetch_ohlcv_data(time_frame):
         'limit': '60',  # Fetch only the last hour data
         'currency': 'usd'
     }
-    response = requests.get(url, params=params)
+    return url, params
+
+def fetch_ohlcv_data(time_frame):
+    url, params = ohlcv_request(time_frame)
+    response = http.get(url, params=params)
     if response.status_code == 200:
         return response.json()  # Process this data as needed
     else:
         print("Failed to fetch data:", response.status_code)
         return None
 
-def prepare_data_for_chart(ohlcv_data):
-    ohlcv_list = ohlcv_data['data']['attributes']['ohlcv_list']
-    data = [{
-        'Date': pd.to_datetime(item[0], unit='s'),
-        'Open': item[1],
-        'High': item[2],
-        'Low': item[3],
-        'Close': item[4],
-        'Volume': item[5]
-    } for item in ohlcv_list]
-
-    data_frame = pd.DataFrame(data)
-    data_frame.sort_values('Date', inplace=True)
-    data_frame.set_index('Date', inplace=True)
+def fetch_minute_candles(before_timestamp=None, limit=CANDLE_PAGE_SIZE):
+    url = f"https://api.geckoterminal.com/api/v2/networks/base/pools/{pool_address}/ohlcv/minute"
+    params = {
+        'aggregate': '1',
+        'limit': str(limit),
+        'currency': 'usd'
+    }
+    if before_timestamp is not None:
+        params['before_timestamp'] = before_timestamp
+    try:
+        response = http.get(url, params=params)
+        response.raise_for_status()
+        return response.json()['data']['attributes']['ohlcv_list']
+    except (requests.RequestException, KeyError, ValueError) as e:
+        print(f"Failed to fetch minute candles: {str(e)}")
+        return None
+
+def sync_candle_store(context: CallbackContext = None) -> None:
+    last_timestamp = candle_store.last_timestamp()
+    fetched = []
+    before_timestamp = None
+    pages = 0
+
+    # A first sync backfills a fixed window, later ones page backwards until they reach what is stored
+    while last_timestamp is not None or pages < CANDLE_BACKFILL_PAGES:
+        limit = CANDLE_PAGE_SIZE
+        if last_timestamp is not None:
+            # Only the minutes since the newest stored candle, which is fetched again as it may have been partial
+            newest = before_timestamp if before_timestamp is not None else int(time.time())
+            limit = max(min((newest - last_timestamp) // 60 + 1, CANDLE_PAGE_SIZE), 1)
+        candles = fetch_minute_candles(before_timestamp, limit)
+        if candles is None and last_timestamp is not None:
+            # Storing only the newer pages would leave a hole, so the catch-up starts over next sync
+            print(f"Candle catch-up failed after {pages} pages, retrying next sync")
+            return
+        if not candles:
+            break
+        pages += 1
+        fetched.extend(candles)
+        oldest = min(candle[0] for candle in candles)
+        if last_timestamp is not None and oldest <= last_timestamp:
+            break
+        # A short page means upstream has nothing older, only a full one is worth paging back from
+        if len(candles) < limit or (before_timestamp is not None and oldest >= before_timestamp):
+            break
+        before_timestamp = oldest
+
+    # The newest stored candle may have been partial, so it is rewritten
+    new_candles = [candle for candle in fetched if last_timestamp is None or candle[0] >= last_timestamp]
+    if not new_candles:
+        return
+    contiguous = last_timestamp is None or min(candle[0] for candle in fetched) <= last_timestamp
+    if not contiguous:
+        print(f"Candle store has a gap after {last_timestamp}, upstream history only reaches back to {min(candle[0] for candle in fetched)}")
+    candle_store.add(new_candles, contiguous=contiguous)
+    print(f"Candle store synced {len(new_candles)} candles over {pages} pages, newest at {candle_store.last_timestamp()}")
+
+def stored_chart_candle(interval, span):
+    """Return the newest stored candle if the store covers the whole chart span, else None."""
+    # The first candle of a chart is allowed to be partial
+    if not candle_store.covers(int(time.time()) - span + interval):
+        return None
+    return candle_store.last_timestamp()
+
+def chart_history_message():
+    covered_since = candle_store.covered_since()
+    if covered_since is None:
+        return 'Chart history is still loading. Please try again shortly.'
+    days = (time.time() - covered_since) / 86400
+    return f'Only the last {days:.1f} days of candles are stored for custom ranges. Please pick a shorter range.'
+
+def parse_duration(text):
+    match = re.fullmatch(r'(\d+)([mhdw])', text.lower())
+    if match is None:
+        return None
+    return int(match.group(1)) * {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}[match.group(2)]
+
+def parse_chart_args(args):
+    """Return (interval, span, legacy time frame, overlays) for /chart, or None if invalid."""
+    legacy = {
+        'm': (60, 60 * 60, 'minute'),
+        'h': (60 * 60, 60 * 60 * 60, 'hour'),
+        'd': (24 * 60 * 60, 60 * 24 * 60 * 60, 'day'),
+    }
+    args = [arg.lower() for arg in args or []]
+
+    # Indicator overlays can follow the time frame, e.g. /chart 4h 7d sma20 vwap
+    overlays = []
+    for arg in [arg for arg in args if chart_overlay_pattern.fullmatch(arg)]:
+        args.remove(arg)
+        match = chart_overlay_pattern.fullmatch(arg)
+        if match.group(1) in ('sma', 'ema'):
+            period = int(match.group(2) or 20)
+            if not 1 < period <= MAX_CHART_CANDLES:
+                return None
+            arg = f"{match.group(1)}{period}"
+        overlays.append(arg)
+    overlays = tuple(overlays)
+
+    if not args:
+        return legacy['m'] + (overlays,)
+    if len(args) == 1 and args[0] in legacy:
+        return legacy[args[0]] + (overlays,)
+
+    interval = parse_duration(args[0])
+    span = parse_duration(args[1]) if len(args) > 1 else (interval * 60 if interval else None)
+    if len(args) > 2 or not interval or not span or span < interval or span // interval > MAX_CHART_CANDLES:
+        return None
+    return interval, span, None, overlays
+
+def load_chart_frame(interval, span):
+    # pandas and mplfinance load on the first /chart, not at startup
+    import charting
+    import pandas as pd
+
+    rows = candle_store.load(since=int(time.time()) - span)
+    if not rows:
+        return None
+
+    data_frame = charting.ohlcv_to_frame(rows)
+
+    # Hour and day candles are built locally from the stored minute candles
+    if interval > 60:
+        data_frame = data_frame.resample(pd.Timedelta(seconds=interval)).agg({
+            'Open': 'first',
+            'High': 'max',
+            'Low': 'min',
+            'Close': 'last',
+            'Volume': 'sum'
+        }).dropna()
     return data_frame
 
-def plot_candlestick_chart(data_frame):
-    mc = mpf.make_marketcolors(
-        up='#2dc60e',
-        down='#ff0000',
-        edge='inherit',
-        wick='inherit',
-        volume='inherit'
-    )
-    s = mpf.make_mpf_style(
-        marketcolors=mc,
-        rc={
-            'font.size': 8,
-            'axes.labelcolor': '#2dc60e',
-            'axes.edgecolor': '#2dc60e',
-            'xtick.color': '#2dc60e',
-            'ytick.color': '#2dc60e',
-            'grid.color': '#0f3e07',
-            'grid.linestyle': '--',
-            'figure.facecolor': 'black',
-            'axes.facecolor': 'black'
-        }
-    )
-    save_path = '/tmp/candlestick_chart.png'
-    mpf.plot(data_frame, type='candle', style=s, volume=True, savefig=save_path)
-    print(f"Chart saved to {save_path}")
+def prepare_data_for_chart(ohlcv_data):
+    import charting
+
+    return charting.ohlcv_to_frame(ohlcv_data['data']['attributes']['ohlcv_list'])
+
+def plot_candlestick_chart(data_frame, overlays=()):
+    future = chart_renderer.submit(data_frame, overlays)
+    if future is None:
+        return None
+    photo = future.result(timeout=CHART_RENDER_TIMEOUT)
+    print(f"Chart rendered ({len(photo)} bytes)")
+    return photo
 #endregion Chart
 
 #region Buybot
+pending_buys = deque(maxlen=500)  # (event, first seen) for buys waiting on a price
+BUY_RETRY_MAX_AGE = 600  # Seconds a buy keeps being retried before it is dropped
+BUY_PRICE_KEY = ('token_price_in_fiat', contract_address, 'usd')
+
+class BuyDigest:
+    """Rolls the buys inside a window into one message that is edited as more arrive."""
+    def __init__(self, window, whale_threshold):
+        self.window = window
+        self.whale_threshold = whale_threshold  # Buys worth at least this many USD skip the digest
+        self._lock = threading.Lock()
+        self._buys = []  # (sypher amount, usd value)
+        self._opened_at = 0
+        self._message_id = None
+        self._dirty = False
+        print(f"Initialized BuyDigest with window={window}, whale_threshold={whale_threshold}")
+
+    def add(self, sypher_amount, usd_value):
+        with self._lock:
+            if time.time() - self._opened_at > self.window:
+                # The last window closed, so the next flush posts a fresh message
+                self._buys = []
+                self._opened_at = time.time()
+                self._message_id = None
+            self._buys.append((sypher_amount, usd_value))
+            self._dirty = True
+
+    def render(self):
+        total_sypher = sum(amount for amount, _ in self._buys)
+        total_usd = sum(usd for _, usd in self._buys)
+        largest = max(usd for _, usd in self._buys)
+        header_emoji, buyer_emoji = categorize_buyer(largest)
+        return (
+            f"{header_emoji}SYPHER BUYS{header_emoji}\n\n"
+            f"{len(self._buys)} buys • {total_sypher:.2f} SYPHER ({total_usd:.2f} USD)\n"
+            f"Largest: {buyer_emoji} {largest:.2f} USD"
+        )
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            text = self.render()
+            message_id = self._message_id
+
+        print(text)
+        try:
+            if message_id is None:
+                msg = send_message(outbound.bot, CHAT_ID, text=text, priority=PRIORITY_BUY)
+                with self._lock:
+                    self._message_id = msg.message_id
+                track_message(msg)
+            else:
+                dispatch(PRIORITY_BUY, CHAT_ID, outbound.bot.edit_message_text, chat_id=CHAT_ID, message_id=message_id, text=text)
+        except Exception as e:
+            print(f"Failed to post buy digest: {e}")
+
+buy_digest_config = config.get('buyDigest', {})
+buy_digest = BuyDigest(buy_digest_config.get('window', 60), buy_digest_config.get('whaleThreshold', 5000)) if buy_digest_config.get('enabled') else None
+
 def monitor_transfers():
-    transfer_filter = contract.events.Transfer.create_filter(fromBlock='latest', argument_filters={'from': pool_address})
-    
+    # Waits for web3 and Firestore, retrying while either is degraded
     while True:
-        for event in transfer_filter.get_new_entries():
-            handle_transfer_event(event)
+        try:
+            log_scanner = LogScanner(
+                checkpoint_ref=firebase.get().collection('buybot').document('checkpoint'),
+                confirmations=config.get('scannerConfirmations', 5),
+                max_catchup=config.get('scannerMaxCatchupBlocks', 43200)
+            )
+            break
+        except Exception as e:
+            print(f"Buy monitor waiting on its subsystems: {e}")
+            time.sleep(30)
+
+    while True:
+        try:
+            handle_transfer_events(log_scanner.scan())
+            log_scanner.commit(pending_buy_block())
+        except Exception as e:
+            print(f"Error scanning transfer logs: {e}")
         time.sleep(10)
 
-def handle_transfer_event(event):
+def pending_buy_block():
+    """Block of the oldest buy still waiting on a price, which the scan checkpoint must not pass."""
+    return min((event['blockNumber'] for event, _ in pending_buys), default=None)
+
+def handle_transfer_events(events):
+    batch = claim_buys(events)
+    if batch:
+        # One quote prices every buy in the cycle, written through the market-data cache
+        post_buys(batch, market_data.get(BUY_PRICE_KEY, lambda: get_token_price_in_fiat(contract_address, 'usd')))
+
+def claim_buys(events):
+    # Buys that could not be priced last cycle are retried with this one
+    batch = list(pending_buys) + [(event, time.time()) for event in events]
+    pending_buys.clear()
+    return batch
+
+def post_buys(batch, sypher_price_in_usd):
+    """Post a cycle's buys at one price, or keep the recent ones for the next cycle when there is no price."""
+    if sypher_price_in_usd is None:
+        retry = [(event, seen_at) for event, seen_at in batch if time.time() - seen_at < BUY_RETRY_MAX_AGE]
+        pending_buys.extend(retry)
+        print(f"Unable to fetch price, retrying {len(retry)} buys next cycle ({len(batch) - len(retry)} expired).")
+        return
+
+    for event, _ in batch:
+        handle_transfer_event(event, Decimal(sypher_price_in_usd))
+
+    if buy_digest is not None:
+        buy_digest.flush()
+
+def handle_transfer_event(event, sypher_price_in_usd):
+    buy = value_buy(event, sypher_price_in_usd)
+    if buy is None:
+        return
+    sypher_amount, total_value_usd = buy
+
+    # Smaller buys are rolled into the digest, whales are still posted right away
+    if buy_digest is not None and total_value_usd < buy_digest.whale_threshold:
+        buy_digest.add(sypher_amount, total_value_usd)
+        return
+
+    send_buy_message(format_buy_message(sypher_amount, total_value_usd))
+
+def value_buy(event, sypher_price_in_usd):
+    """Return (SYPHER amount, USD value) for a buy worth posting, or None."""
     from_address = event['args']['from']
     amount = event['args']['value']
     
     # Check if the transfer is from the LP address
-    if from_address.lower() == pool_address.lower():
-        # Convert amount to SYPHER (from Wei)
-        sypher_amount = web3.from_wei(amount, 'ether')
-
-        sypher_price_in_usd = get_token_price_in_fiat(contract_address, 'usd')
-        if sypher_price_in_usd is not None:
-            sypher_price_in_usd = Decimal(sypher_price_in_usd)
-            total_value_usd = sypher_amount * sypher_price_in_usd
-            if total_value_usd < 1000:
-                print("Ignoring small buy")
-                return
-            value_message = f" ({total_value_usd:.2f} USD)"
-            header_emoji, buyer_emoji = categorize_buyer(total_value_usd)
-        else:
-            print("Unable to fetch price due to rate limiting.")
+    if from_address.lower() != pool_address.lower():
+        return None
+
+    # Convert amount to SYPHER (from Wei)
+    sypher_amount = Decimal(amount) / Decimal(10 ** 18)
+
+    total_value_usd = sypher_amount * sypher_price_in_usd
+    if total_value_usd < 1000:
+        print("Ignoring small buy")
+        return None
+    return sypher_amount, total_value_usd
 
-        message = f"{header_emoji}SYPHER BUY{header_emoji}\n\n{buyer_emoji} {sypher_amount:.2f} SYPHER{value_message}"
-        print(message)
+def format_buy_message(sypher_amount, total_value_usd):
+    value_message = f" ({total_value_usd:.2f} USD)"
+    header_emoji, buyer_emoji = categorize_buyer(total_value_usd)
 
-        send_buy_message(message)
+    message = f"{header_emoji}SYPHER BUY{header_emoji}\n\n{buyer_emoji} {sypher_amount:.2f} SYPHER{value_message}"
+    print(message)
+    return message
 
 def categorize_buyer(usd_value):
     if usd_value < 2500:
@@ -938,99 +2661,149 @@ def categorize_buyer(usd_value):
         return "🤑", "🐳"
     
 def send_buy_message(text):
-    msg = None
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    msg = bot.send_message(chat_id=CHAT_ID, text=text)
-    if msg is not None:
-        track_message(msg)
+    # Fire and forget, the shared bot sends it once the buy lane gets its turn
+    future = send_message(outbound.bot, CHAT_ID, text=text, priority=PRIORITY_BUY, wait=False)
+    track_when_sent(future)
 #endregion Buybot
 
 #endregion Ethereum Logic
 
 #region Ethereum Slash Commands
+# Message builders shared with the asyncio runtime in async_bot.py
+def parse_price_currency(args):
+    currency = (args[0] if args else 'usd').lower()
+    return currency if currency in PRICE_CURRENCIES else None
+
+def format_price_message(currency, token_price_in_fiat):
+    if token_price_in_fiat is None:
+        return f"Failed to retrieve the price of the token in {currency.upper()}."
+    return f"SYPHER • {currency.upper()}: {format(token_price_in_fiat, '.4f')}"
+
+def format_liquidity_message(liquidity_usd):
+    if not liquidity_usd:
+        return "Failed to fetch liquidity data."
+    return f"Liquidity: ${liquidity_usd}"
+
+def format_volume_message(volume_24h_usd):
+    if not volume_24h_usd:
+        return "Failed to fetch volume data."
+    return f"24-hour trading volume in USD: ${volume_24h_usd}"
+
+def format_stats_message(snapshot):
+    if not snapshot:
+        return "Failed to fetch pool data."
+    volume_usd = snapshot['volume_usd']
+    transactions = snapshot['transactions'].get('h24', {})
+    price_change = snapshot['price_change'].get('h24')
+    lines = [
+        "SYPHER • Pool Stats",
+        f"Price: ${float(snapshot['price_usd'] or 0):.4f}" + (f" ({float(price_change):+.2f}% 24h)" if price_change is not None else ""),
+        f"Liquidity: ${float(snapshot['reserve_usd'] or 0):,.2f}",
+        "Volume: " + " • ".join(f"{window} ${float(volume_usd[window]):,.2f}" for window in ('m5', 'h1', 'h6', 'h24') if volume_usd.get(window) is not None),
+        f"24h Transactions: {transactions.get('buys', 0)} buys / {transactions.get('sells', 0)} sells",
+    ]
+    return "\n".join(lines)
+
 def price(update: Update, context: CallbackContext) -> None:
     msg = None
-    if rate_limit_check():
-        currency = context.args[0] if context.args else 'usd'
-        currency = currency.lower()
-
-        # Check if the provided currency is supported
-        if currency not in ['usd', 'eur', 'jpy', 'gbp', 'aud', 'cad', 'mxn']:
-            msg = update.message.reply_text("Unsupported currency. Please use 'usd', 'eur'. 'jpy', 'gbp', 'aud', 'cad' or 'mxn'.")
-            return
-
-        # Fetch and format the token price in the specified currency
-        token_price_in_fiat = get_token_price_in_fiat(contract_address, currency)
-        if token_price_in_fiat is not None:
-            formatted_price = format(token_price_in_fiat, '.4f')
-            msg = update.message.reply_text(f"SYPHER • {currency.upper()}: {formatted_price}")
+    if rate_limit_check(update):
+        currency = parse_price_currency(context.args)
+        if currency is None:
+            msg = reply(update, UNSUPPORTED_CURRENCY_MESSAGE)
         else:
-            msg = update.message.reply_text(f"Failed to retrieve the price of the token in {currency.upper()}.")
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
+            msg = reply(update, format_price_message(currency, get_token_price_in_fiat(contract_address, currency)))
     
     if msg is not None:
         track_message(msg)
 
 def liquidity(update: Update, context: CallbackContext) -> None:
     msg = None
-    if rate_limit_check():
-        liquidity_usd = get_liquidity()
-        if liquidity_usd:
-            msg = update.message.reply_text(f"Liquidity: ${liquidity_usd}")
-        else:
-            msg = update.message.reply_text("Failed to fetch liquidity data.")
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
+    if rate_limit_check(update):
+        msg = reply(update, format_liquidity_message(get_liquidity()))
     
     if msg is not None:
         track_message(msg)
 
 def volume(update, context):
     msg = None
-    if rate_limit_check():
-        volume_24h_usd = get_volume()
-        if volume_24h_usd:
-            msg = update.message.reply_text(f"24-hour trading volume in USD: ${volume_24h_usd}")
-        else:
-            msg = update.message.reply_text("Failed to fetch volume data.")
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
+    if rate_limit_check(update):
+        msg = reply(update, format_volume_message(get_volume()))
     
     if msg is not None:
         track_message(msg)
 
-def chart(update: Update, context: CallbackContext) -> None:
-    args = context.args
-    time_frame = 'minute'  # default to minute if no argument is provided
+def stats(update: Update, context: CallbackContext) -> None:
+    msg = None
+    if rate_limit_check(update):
+        msg = reply(update, format_stats_message(get_pool_snapshot()))
     
-    if args:
-        interval_arg = args[0].lower()
-        if interval_arg == 'h':
-            time_frame = 'hour'
-        elif interval_arg == 'd':
-            time_frame = 'day'
-        elif interval_arg == 'm':
-            time_frame = 'minute'
-        else:
-            msg = update.message.reply_text('Invalid time frame specified. Please use /chart with m, h, or d.')
-            return
-        
-    if rate_limit_check():
-        msg = None
-        ohlcv_data = fetch_ohlcv_data(time_frame)
-        if ohlcv_data:
-            data_frame = prepare_data_for_chart(ohlcv_data)
-            plot_candlestick_chart(data_frame)
-            msg = update.message.reply_photo(
-                photo=open('/tmp/candlestick_chart.png', 'rb'),
-                caption='\n[Dexscreener](https://dexscreener.com/base/0xb0fbaa5c7d28b33ac18d9861d4909396c1b8029b) • [Dextools](https://www.dextools.io/app/en/base/pair-explorer/0xb0fbaa5c7d28b33ac18d9861d4909396c1b8029b?t=1715831623074) • [CMC](https://coinmarketcap.com/dexscan/base/0xb0fbaa5c7d28b33ac18d9861d4909396c1b8029b/) • [CG](https://www.geckoterminal.com/base/pools/0xb0fbaa5c7d28b33ac18d9861d4909396c1b8029b?utm_source=coingecko)\n',
+    if msg is not None:
+        track_message(msg)
+
+def chart(update: Update, context: CallbackContext) -> None:
+    msg = None
+    chart_spec = parse_chart_args(context.args)
+
+    if chart_spec is None:
+        msg = reply(update, INVALID_CHART_MESSAGE)
+        if msg is not None:
+            track_message(msg)
+        return
+
+    interval, span, time_frame, overlays = chart_spec
+
+    if rate_limit_check(update):
+        # Prefer the local candle store, falling back to GeckoTerminal when it does not cover the span
+        last_candle = stored_chart_candle(interval, span)
+        build_frame = lambda: load_chart_frame(interval, span)
+        if last_candle is None:
+            if time_frame is None:
+                msg = reply(update, chart_history_message())
+                if msg is not None:
+                    track_message(msg)
+                return
+            ohlcv_data = market_data.get(('ohlcv', time_frame), lambda: fetch_ohlcv_data(time_frame))
+            if ohlcv_data and ohlcv_data['data']['attributes']['ohlcv_list']:
+                last_candle = max(item[0] for item in ohlcv_data['data']['attributes']['ohlcv_list'])
+                build_frame = lambda: prepare_data_for_chart(ohlcv_data)
+
+        photo = None
+        if last_candle is not None:
+            # A chart only changes when a new candle arrives
+            chart_key = (interval, span, overlays, last_candle)
+            photo = chart_cache.get(chart_key)
+            if photo is None:
+                data_frame = build_frame()
+                if data_frame is not None and not data_frame.empty:
+                    if chart_renderer.is_saturated():
+                        track_when_sent(reply(update, 'Rendering…', wait=False))
+                    try:
+                        photo = plot_candlestick_chart(data_frame, overlays)
+                    except Exception as e:
+                        print(f"Chart render failed: {str(e)}")
+                        msg = reply(update, CHART_FAILED_MESSAGE)
+                        if msg is not None:
+                            track_message(msg)
+                        return
+                    if photo is None:
+                        msg = reply(update, CHART_BUSY_MESSAGE)
+                        if msg is not None:
+                            track_message(msg)
+                        return
+                    chart_cache.put(chart_key, photo)
+
+        if photo is not None:
+            msg = dispatch(
+                PRIORITY_CHAT, update.effective_chat.id, update.message.reply_photo,
+                photo=io.BytesIO(photo) if isinstance(photo, bytes) else photo,
+                caption=CHART_CAPTION,
                 parse_mode='Markdown'
             )
+            if msg is not None and msg.photo:
+                # Later requests resend the uploaded photo by file_id
+                chart_cache.put(chart_key, msg.photo[-1].file_id)
         else:
-            msg = update.message.reply_text('Failed to fetch data or generate chart. Please try again later.')
-    else:
-        msg = update.message.reply_text('Bot rate limit exceeded. Please try again later.')
+            msg = reply(update, CHART_FAILED_MESSAGE)
     
     if msg is not None:
         track_message(msg)
@@ -1044,20 +2817,22 @@ def handle_new_user(update: Update, context: CallbackContext) -> None:
         chat_id = update.message.chat.id
 
         # Mute the new user
-        context.bot.restrict_chat_member(
+        dispatch(
+            PRIORITY_MODERATION, chat_id, context.bot.restrict_chat_member,
             chat_id=chat_id,
             user_id=user_id,
-            permissions=ChatPermissions(can_send_messages=False)
+            permissions=ChatPermissions(can_send_messages=False),
+            wait=False
         )
 
         if anti_raid.is_raid():
-            msg = update.message.reply_text(f'Anti-raid triggered! Please wait {anti_raid.time_to_wait()} seconds before new users can join.')
-            
             # Get the user_id of the user that just joined
             user_id = update.message.new_chat_members[0].id
 
             # Kick the user that just joined
-            context.bot.kick_chat_member(chat_id=chat_id, user_id=user_id)
+            dispatch(PRIORITY_MODERATION, chat_id, context.bot.ban_chat_member, chat_id=chat_id, user_id=user_id, wait=False)
+
+            track_when_sent(reply(update, f'Anti-raid triggered! Please wait {anti_raid.time_to_wait()} seconds before new users can join.', wait=False))
             return
         
         print("Allowing new user to join, antiraid is not active.")
@@ -1077,15 +2852,18 @@ def handle_new_user(update: Update, context: CallbackContext) -> None:
         
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        welcomeMessage = context.bot.send_message(chat_id=chat_id, text=welcome_message, reply_markup=reply_markup, parse_mode='Markdown')
-        welcome_message_id = welcomeMessage.message_id
-        context.chat_data['non_deletable_message_id'] = welcomeMessage.message_id
-
-        # Start a verification timeout job
+        # Start a verification timeout job before the welcome goes out, so a backed up queue cannot leave the user muted for good
+        verification = {'chat_id': CHAT_ID, 'user_id': user_id, 'welcome_message_id': None}
         job_queue = context.job_queue
-        job_queue.run_once(verification_timeout, 600, context={'chat_id': CHAT_ID, 'user_id': user_id, 'welcome_message_id': welcome_message_id}, name=str(user_id))
+        job_queue.run_once(verification_timeout, 600, context=verification, name=str(user_id))
 
-        update.message.delete()
+        def welcome_sent(welcomeMessage, verification=verification):
+            verification['welcome_message_id'] = welcomeMessage.message_id
+            context.chat_data['non_deletable_message_id'] = welcomeMessage.message_id
+
+        on_sent(send_message(context.bot, chat_id=chat_id, text=welcome_message, reply_markup=reply_markup, parse_mode='Markdown', wait=False), welcome_sent)
+
+        dispatch(PRIORITY_MODERATION, chat_id, update.message.delete, wait=False)
 
     if msg is not None:
         track_message(msg)
@@ -1096,7 +2874,7 @@ def start_verification_dm(user_id: int, context: CallbackContext) -> None:
     keyboard = [[InlineKeyboardButton("Start Verification", callback_data='start_verification')]]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    message = context.bot.send_message(chat_id=user_id, text=verification_message, reply_markup=reply_markup)
+    message = send_message(context.bot, chat_id=user_id, text=verification_message, reply_markup=reply_markup)
     return message.message_id
 
 def verification_callback(update: Update, context: CallbackContext) -> None:
@@ -1104,7 +2882,7 @@ def verification_callback(update: Update, context: CallbackContext) -> None:
     callback_data = query.data
     user_id = query.from_user.id
     chat_id = query.message.chat_id
-    query.answer()
+    answer(query)
 
     # Extract user_id from the callback_data
     _, callback_user_id = callback_data.split('_')
@@ -1120,7 +2898,7 @@ def verification_callback(update: Update, context: CallbackContext) -> None:
     start_verification_dm(user_id, context)
     
     # Optionally, you can edit the original message to indicate the button was clicked
-    verification_started_message = query.edit_message_text(text="A verification message has been sent to your DMs. Please check your messages.")
+    verification_started_message = dispatch(PRIORITY_CHAT, chat_id, query.edit_message_text, text="A verification message has been sent to your DMs. Please check your messages.")
     verification_started_id = verification_started_message.message_id
 
     job_queue = context.job_queue
@@ -1128,9 +2906,11 @@ def verification_callback(update: Update, context: CallbackContext) -> None:
 
 def delete_verification_message(context: CallbackContext) -> None:
     job = context.job
-    context.bot.delete_message(
+    dispatch(
+        PRIORITY_MODERATION, job.context['chat_id'], context.bot.delete_message,
         chat_id=job.context['chat_id'],
-        message_id=job.context['message_id']
+        message_id=job.context['message_id'],
+        wait=False
     )
 
 def generate_verification_buttons() -> InlineKeyboardMarkup:
@@ -1169,7 +2949,7 @@ def generate_verification_buttons() -> InlineKeyboardMarkup:
 def handle_start_verification(update: Update, context: CallbackContext) -> None:
     query = update.callback_query
     user_id = query.from_user.id
-    query.answer()
+    answer(query)
 
     # Initialize user verification progress
     user_verification_progress[user_id] = {
@@ -1183,7 +2963,8 @@ def handle_start_verification(update: Update, context: CallbackContext) -> None:
     reply_markup = generate_verification_buttons()
 
     # Edit the initial verification prompt
-    context.bot.edit_message_text(
+    dispatch(
+        PRIORITY_CHAT, user_id, context.bot.edit_message_text,
         chat_id=user_id,
         message_id=user_verification_progress[user_id]['verification_message_id'],
         text=verification_question,
@@ -1194,7 +2975,7 @@ def handle_verification_button(update: Update, context: CallbackContext) -> None
     query = update.callback_query
     user_id = query.from_user.id
     letter = query.data.split('_')[2]  # Get the letter from callback_data
-    query.answer()
+    answer(query)
 
     # Update user verification progress
     if user_id in user_verification_progress:
@@ -1203,30 +2984,26 @@ def handle_verification_button(update: Update, context: CallbackContext) -> None
         # Only check the sequence after the fifth button press
         if len(user_verification_progress[user_id]['progress']) == len(VERIFICATION_LETTERS):
             if user_verification_progress[user_id]['progress'] == list(VERIFICATION_LETTERS):
-                context.bot.edit_message_text(
+                dispatch(
+                    PRIORITY_CHAT, user_id, context.bot.edit_message_text,
                     chat_id=user_id,
                     message_id=user_verification_progress[user_id]['verification_message_id'],
                     text="Verification successful, you may now return to chat!"
                 )
                 print("User successfully verified.")
                 # Unmute the user in the main chat
-                context.bot.restrict_chat_member(
+                dispatch(
+                    PRIORITY_MODERATION, CHAT_ID, context.bot.restrict_chat_member,
                     chat_id=CHAT_ID,
                     user_id=user_id,
-                    permissions=ChatPermissions(
-                        can_send_messages=True,
-                        can_send_media_messages=True,
-                        can_send_other_messages=True,
-                        can_send_videos=True,
-                        can_send_photos=True,
-                        can_send_audios=True
-                    )
+                    permissions=sending_permissions(True)
                 )
                 current_jobs = context.job_queue.get_jobs_by_name(str(user_id))
                 for job in current_jobs:
                     job.schedule_removal()
             else:
-                context.bot.edit_message_text(
+                dispatch(
+                    PRIORITY_CHAT, user_id, context.bot.edit_message_text,
                     chat_id=user_id,
                     message_id=user_verification_progress[user_id]['verification_message_id'],
                     text="Verification failed. Please try again.",
@@ -1236,7 +3013,8 @@ def handle_verification_button(update: Update, context: CallbackContext) -> None
             # Reset progress after verification attempt
             user_verification_progress.pop(user_id)
     else:
-        context.bot.edit_message_text(
+        dispatch(
+            PRIORITY_CHAT, user_id, context.bot.edit_message_text,
             chat_id=user_id,
             message_id=user_verification_progress[user_id]['verification_message_id'],
             text="Verification failed. Please try again.",
@@ -1247,15 +3025,21 @@ def handle_verification_button(update: Update, context: CallbackContext) -> None
 def verification_timeout(context: CallbackContext) -> None:
     msg = None
     job = context.job
-    context.bot.kick_chat_member(
+    dispatch(
+        PRIORITY_MODERATION, job.context['chat_id'], context.bot.ban_chat_member,
         chat_id=job.context['chat_id'],
-        user_id=job.context['user_id']
+        user_id=job.context['user_id'],
+        wait=False
     )
     
-    context.bot.delete_message(
-        chat_id=job.context['chat_id'],
-        message_id=job.context['welcome_message_id']
-    )
+    # The welcome may never have gone out
+    if job.context['welcome_message_id'] is not None:
+        dispatch(
+            PRIORITY_MODERATION, job.context['chat_id'], context.bot.delete_message,
+            chat_id=job.context['chat_id'],
+            message_id=job.context['welcome_message_id'],
+            wait=False
+        )
 
     if msg is not None:
         track_message(msg)
@@ -1263,70 +3047,103 @@ def verification_timeout(context: CallbackContext) -> None:
 #region Admin Controls
 def unmute_user(context: CallbackContext) -> None:
     job = context.job
-    context.bot.restrict_chat_member(
+    dispatch(
+        PRIORITY_MODERATION, job.context['chat_id'], context.bot.restrict_chat_member,
         chat_id=job.context['chat_id'],
         user_id=job.context['user_id'],
-        permissions=ChatPermissions(
-            can_send_messages=True,
-            can_send_media_messages=True,
-            can_send_other_messages=True,
-            can_send_videos=True,
-            can_send_photos=True,
-            can_send_audios=True
-            )
+        permissions=sending_permissions(True),
+        wait=False
     )
 
 def handle_message(update: Update, context: CallbackContext) -> None:
-
-    handle_guess(update, context)
-
     if is_user_admin(update, context):
         return
-    
-    delete_unallowed_addresses(update, context)
-    delete_filtered_phrases(update, context)
-    delete_blocked_links(update, context)
-    
-    user_id = update.message.from_user.id
-    chat_id = update.message.chat.id
-    username = update.message.from_user.username or update.message.from_user.first_name
-    msg = None
 
+    message_text = update.message.text
+    if message_text is None:
+        return
+
+    verdict = moderate_message(message_text, update.message.from_user.id)
+    if verdict:
+        apply_verdict(update, context, verdict)
+
+def moderate_message(message_text, user_id) -> ModerationVerdict:
+    text = message_text.lower()  # Lowercase once for every check below
+    verdict = ModerationVerdict()
+
+    for match in moderation_pattern.finditer(text):
+        found = match.group()
+        if match.lastgroup == 'address' and found not in allowed_addresses:
+            verdict = ModerationVerdict(ModerationVerdict.DELETE, 'address', found)
+            break
+        if match.lastgroup == 'link' and found not in allowed_links:
+            verdict = ModerationVerdict(ModerationVerdict.DELETE, 'link', found)
+            break
+
+    if not verdict:
+        phrase = phrase_filter.find(text)
+        if phrase is not None:
+            verdict = ModerationVerdict(ModerationVerdict.DELETE, 'filter', phrase)
+
+    # Every message counts towards the spam window, and a mute outranks a delete without dropping it
     if anti_spam.is_spam(user_id):
-        mute_time = anti_spam.mute_time  # Get the mute time from AntiSpam class
-        msg = update.message.reply_text(f'{username}, you are spamming. You have been muted for {mute_time} seconds.')
+        verdict = ModerationVerdict(ModerationVerdict.MUTE, 'spam', verdict.detail, delete=verdict.delete)
+
+    return verdict
 
+def apply_verdict(update: Update, context: CallbackContext, verdict: ModerationVerdict) -> None:
+    print(f"Moderation verdict: {verdict}")
+    msg = None
+
+    if verdict.delete:
+        dispatch(PRIORITY_MODERATION, update.message.chat.id, update.message.delete, wait=False)
+        print(f"Queued message deletion ({verdict.reason}).")
+
+    if verdict.action == ModerationVerdict.MUTE:
+        user_id = update.message.from_user.id
+        chat_id = update.message.chat.id
+        username = update.message.from_user.username or update.message.from_user.first_name
+        mute_time = anti_spam.mute_time  # Get the mute time from AntiSpam class
         # Mute the user for the mute time
         until_date = int(time.time() + mute_time)
-        context.bot.restrict_chat_member(
+        dispatch(
+            PRIORITY_MODERATION, chat_id, context.bot.restrict_chat_member,
             chat_id=chat_id,
             user_id=user_id,
             permissions=ChatPermissions(can_send_messages=False),
-            until_date=until_date
+            until_date=until_date,
+            wait=False
         )
 
+        track_when_sent(reply(update, f'{username}, you are spamming. You have been muted for {mute_time} seconds.', wait=False))
+
         # Schedule job to unmute the user
         job_queue = context.job_queue
         job_queue.run_once(unmute_user, mute_time, context={'chat_id': chat_id, 'user_id': user_id})
-    
+
     if msg is not None:
         track_message(msg)
 
-def rate_limit_check():
-    global last_check_time, command_count
-    current_time = time.time()
+def prune_trackers(context: CallbackContext) -> None:
+    evicted = anti_spam.evict_idle()
+    print(f"AntiSpam evicted {evicted} idle users, tracking {len(anti_spam)} users in {anti_spam.memory_footprint()} bytes")
+    print(f"Command rate limiter evicted {command_limiter.evict_idle()} idle buckets")
+    bot_messages.prune()
+    print(f"Tracking {len(bot_messages)} bot messages")
 
-    # Reset count if time period has expired
-    if current_time - last_check_time > TIME_PERIOD:
-        command_count = 0
-        last_check_time = current_time
+def rate_limit_check(update: Update) -> bool:
+    chat_id = update.effective_chat.id if update.effective_chat else None
+    user = update.effective_user
 
-    # Check if the bot is within the rate limit
-    if command_count < RATE_LIMIT:
-        command_count += 1
+    # Help buttons charge whoever pressed them before replaying the command on the bot's own message
+    if user is not None and user.is_bot:
         return True
-    else:
-        return False
+    user_id = user.id if user is not None else None
+
+    allowed = command_limiter.allow(chat_id, user_id)
+    if not allowed:
+        print(f"Rate limited command from user {user_id} in chat {chat_id}")
+    return allowed
 
 def is_user_admin(update: Update, context: CallbackContext) -> bool:
     chat_id = update.effective_chat.id
@@ -1336,85 +3153,20 @@ def is_user_admin(update: Update, context: CallbackContext) -> bool:
         print("User is in a private chat.")
         return False
 
-    # Check if the user is an admin in this chat
-    chat_admins = context.bot.get_chat_administrators(chat_id)
-    user_is_admin = any(admin.user.id == user_id for admin in chat_admins)
+    # Check if the user is an admin in this chat, refreshing the cached list when it expires
+    chat_admins = admin_cache.get(chat_id, lambda chat_id: dispatch(PRIORITY_MODERATION, chat_id, context.bot.get_chat_administrators, chat_id))
+    user_is_admin = user_id in chat_admins
 
     return user_is_admin
 
-def delete_unallowed_addresses(update: Update, context: CallbackContext):
-    print("Checking message for unallowed addresses...")
-
-    message_text = update.message.text
-
-    if message_text is None:
-        print("No text in message.")
-        return
-    
-    found_addresses = eth_address_pattern.findall(message_text)
-
-    print(f"Found addresses: {found_addresses}")
-
-    allowed_addresses = [config['contractAddress'].lower(), config['lpAddress'].lower()]
+def handle_chat_member_update(update: Update, context: CallbackContext) -> None:
+    member_update = update.chat_member or update.my_chat_member
+    admin_statuses = (ChatMember.ADMINISTRATOR, ChatMember.CREATOR)
 
-    print(f"Allowed addresses: {allowed_addresses}")
-
-    for address in found_addresses:
-        if address.lower() not in allowed_addresses:
-            update.message.delete()
-            break
-
-def delete_filtered_phrases(update: Update, context: CallbackContext):
-    print("Checking message for filtered phrases...")
-
-    message_text = update.message.text
-
-    if message_text is None:
-        print("No text in message.")
-        return
-
-    message_text = update.message.text.lower()  # Convert to lowercase for case-insensitive matching
-
-    # Retrieve filtered words from Firestore
-    docs = db.collection('filters').stream()
-
-    filtered_phrases = [doc.id for doc in docs]
-    
-    for phrase in filtered_phrases:
-        if phrase in message_text:
-            print(f"Found filter: {phrase}")
-            try:
-                update.message.delete()
-                print("Message deleted.")
-            except Exception as e:  # Catch potential errors in message deletion
-                print(f"Error deleting message: {e}")
-            break  # Exit loop after deleting the message
-
-def delete_blocked_links(update: Update, context: CallbackContext):
-    print("Checking message for unallowed Telegram links...")
-    message_text = update.message.text
-
-    if message_text is None:
-        print("No text in message.")
-        return
-    
-    found_links = telegram_links_pattern.findall(message_text)
-    print(f"Found Telegram links: {found_links}")
-
-    allowed_links = [
-        'https://t.me/tukyogames',
-        'https://t.me/tukyowave',
-        'https://t.me/tukyogamesannouncements'
-    ]
-
-    for link in found_links:
-        if link not in allowed_links:
-            try:
-                update.message.delete()
-                print("Deleted a message with unallowed Telegram link.")
-                return  # Stop further checking if a message is deleted
-            except Exception as e:
-                print(f"Failed to delete message: {e}")
+    # Drop the cached admin list whenever someone is promoted or demoted
+    if member_update.old_chat_member.status in admin_statuses or member_update.new_chat_member.status in admin_statuses:
+        admin_cache.invalidate(member_update.chat.id)
+        print(f"Admin list changed in chat {member_update.chat.id}, cache invalidated.")
 
 def delete_service_messages(update, context):
     # Check if the message ID is marked as non-deletable
@@ -1424,7 +3176,7 @@ def delete_service_messages(update, context):
 
     if update.message.left_chat_member or update.message.new_chat_members:
         try:
-            context.bot.delete_message(chat_id=update.message.chat_id, message_id=update.message.message_id)
+            dispatch(PRIORITY_MODERATION, update.message.chat_id, context.bot.delete_message, chat_id=update.message.chat_id, message_id=update.message.message_id)
             print(f"Deleted service message in chat {update.message.chat_id}")
         except Exception as e:
             print(f"Failed to delete service message: {str(e)}")
@@ -1434,9 +3186,10 @@ def delete_service_messages(update, context):
 def admin_help(update: Update, context: CallbackContext) -> None:
     msg = None
     if is_user_admin(update, context):
-        msg = update.message.reply_text(
+        msg = reply(update, 
             "Admin commands:\n"
             "/cleanbot - Cleans all bot messages\n"
+            "/status - Show upstream API health\n"
             "/cleargames - Clear all active games\n"
             "/antiraid - Manage anti-raid settings\n"
             "/mute - Mute a user\n"
@@ -1451,6 +3204,37 @@ def admin_help(update: Update, context: CallbackContext) -> None:
     if msg is not None:
         track_message(msg)
 
+def status(update: Update, context: CallbackContext) -> None:
+    msg = None
+    if is_user_admin(update, context):
+        msg = reply(update, format_status_message(subsystem_report(firebase, web3, contract)))
+    else:
+        msg = reply(update, "You must be an admin to use this command.")
+
+    if msg is not None:
+        track_message(msg)
+
+def format_status_message(subsystems, *extra_lines):
+    # Shared with the asyncio runtime, which reports its own RPC connection and tasks
+    lines = ["Upstreams:"]
+    for host, upstream in sorted(http.stats().items()):
+        average = upstream['latency_total'] / upstream['requests'] * 1000 if upstream['requests'] else 0
+        state = 'open' if upstream['consecutive_failures'] >= http.failure_threshold else 'closed'
+        lines.append(
+            f"{host}: {upstream['requests']} requests, {upstream['errors']} errors, {upstream['retries']} retries, "
+            f"{upstream['rejected']} rejected, avg {average:.0f}ms, max {upstream['latency_max'] * 1000:.0f}ms, circuit {state}"
+        )
+    if len(lines) == 1:
+        lines.append("No requests yet.")
+    lines.append(f"Subsystems: {subsystems}")
+    lines.append("Handlers: " + ", ".join(
+        f"{name} {stats['busy']}/{pool.workers} busy, {stats['queued']} queued, {stats['shed']} shed"
+        for name, pool in handler_pools.items() for stats in (pool.stats(),)
+    ))
+    lines.extend(extra_lines)
+    lines.append(f"Startup: {startup_report()}")
+    return "\n".join(lines)
+
 def cleargames(update: Update, context: CallbackContext) -> None:
     msg = None
     chat_id = update.effective_chat.id
@@ -1461,9 +3245,9 @@ def cleargames(update: Update, context: CallbackContext) -> None:
             del context.chat_data[key]
             print(f"Deleted key: {key}")
     
-        msg = update.message.reply_text("All active games have been cleared.")
+        msg = reply(update, "All active games have been cleared.")
     else:
-        msg = update.message.reply_text("You must be an admin to use this command.")
+        msg = reply(update, "You must be an admin to use this command.")
         print(f"User {update.effective_user.id} tried to clear games but is not an admin in chat {update.effective_chat.id}.")
     
     if msg is not None:
@@ -1475,17 +3259,17 @@ def antiraid(update: Update, context: CallbackContext) -> None:
 
     if is_user_admin(update, context):
         if not args:
-            msg = update.message.reply_text("Usage: /antiraid end or /antiraid [user_amount] [time_out] [anti_raid_time]")
+            msg = reply(update, "Usage: /antiraid end or /antiraid [user_amount] [time_out] [anti_raid_time]")
             return
 
         command = args[0]
         if command == 'end':
             if anti_raid.is_raid():
                 anti_raid.anti_raid_end_time = 0
-                msg = update.message.reply_text("Anti-raid timer ended. System reset to normal operation.")
+                msg = reply(update, "Anti-raid timer ended. System reset to normal operation.")
                 print("Anti-raid timer ended. System reset to normal operation.")
             else:
-                msg = update.message.reply_text("No active anti-raid to end.")
+                msg = reply(update, "No active anti-raid to end.")
         else:
             try:
                 user_amount = int(args[0])
@@ -1494,12 +3278,12 @@ def antiraid(update: Update, context: CallbackContext) -> None:
                 anti_raid.user_amount = user_amount
                 anti_raid.time_out = time_out
                 anti_raid.anti_raid_time = anti_raid_time
-                msg = update.message.reply_text(f"Anti-raid settings updated: user_amount={user_amount}, time_out={time_out}, anti_raid_time={anti_raid_time}")
+                msg = reply(update, f"Anti-raid settings updated: user_amount={user_amount}, time_out={time_out}, anti_raid_time={anti_raid_time}")
                 print(f"Updated AntiRaid settings to user_amount={user_amount}, time_out={time_out}, anti_raid_time={anti_raid_time}")
             except (IndexError, ValueError):
-                msg = update.message.reply_text("Invalid arguments. Usage: /antiraid [user_amount] [time_out] [anti_raid_time]")
+                msg = reply(update, "Invalid arguments. Usage: /antiraid [user_amount] [time_out] [anti_raid_time]")
     else:
-        msg = update.message.reply_text("You must be an admin to use this command.")
+        msg = reply(update, "You must be an admin to use this command.")
         print(f"User {update.effective_user.id} tried to use /antiraid but is not an admin in chat {update.effective_chat.id}.")
     
     if msg is not None:
@@ -1511,7 +3295,7 @@ def toggle_mute(update: Update, context: CallbackContext, mute: bool) -> None:
 
     if is_user_admin(update, context):
         if update.message.reply_to_message is None:
-            msg = update.message.reply_text("This command must be used in response to another message!")
+            msg = reply(update, "This command must be used in response to another message!")
             if msg is not None:
                 track_message(msg)
             return
@@ -1520,23 +3304,19 @@ def toggle_mute(update: Update, context: CallbackContext, mute: bool) -> None:
             user_id = reply_to_message.from_user.id
             username = reply_to_message.from_user.username or reply_to_message.from_user.first_name
 
-        context.bot.restrict_chat_member(
+        dispatch(
+            PRIORITY_MODERATION, chat_id, context.bot.restrict_chat_member,
             chat_id=chat_id,
             user_id=user_id,
-            permissions=ChatPermissions(
-                can_send_messages=not mute,
-                can_send_media_messages=not mute,
-                can_send_other_messages=not mute,
-                can_send_videos=not mute,
-                can_send_photos=not mute,
-                can_send_audios=not mute
-                )
+            permissions=sending_permissions(not mute)
         )
 
+        admin_cache.invalidate(chat_id)
+
         action = "muted" if mute else "unmuted"
-        msg = update.message.reply_text(f"User {username} has been {action}.")
+        msg = reply(update, f"User {username} has been {action}.")
     else:
-        msg = update.message.reply_text("You must be an admin to use this command.")
+        msg = reply(update, "You must be an admin to use this command.")
     
     if msg is not None:
         track_message(msg)
@@ -1553,7 +3333,7 @@ def kick(update: Update, context: CallbackContext) -> None:
 
     if is_user_admin(update, context):
         if update.message.reply_to_message is None:
-            msg = update.message.reply_text("This command must be used in response to another message!")
+            msg = reply(update, "This command must be used in response to another message!")
             if msg is not None:
                 track_message(msg)
             return
@@ -1562,31 +3342,144 @@ def kick(update: Update, context: CallbackContext) -> None:
             user_id = reply_to_message.from_user.id
             username = reply_to_message.from_user.username or reply_to_message.from_user.first_name
 
-        context.bot.kick_chat_member(chat_id=chat_id, user_id=user_id)
-        msg = update.message.reply_text(f"User {username} has been kicked.")
+        dispatch(PRIORITY_MODERATION, chat_id, context.bot.ban_chat_member, chat_id=chat_id, user_id=user_id)
+        admin_cache.invalidate(chat_id)
+        msg = reply(update, f"User {username} has been kicked.")
     else:
-        msg = update.message.reply_text("You must be an admin to use this command.")
+        msg = reply(update, "You must be an admin to use this command.")
     
     if msg is not None:
         track_message(msg)
 
 def cleanbot(update: Update, context: CallbackContext):
-    global bot_messages
+    msg = None
     if is_user_admin(update, context):
         chat_id = update.effective_chat.id
 
-        messages_to_delete = [msg_id for cid, msg_id in bot_messages if cid == chat_id]
+        messages_to_delete = bot_messages.pop_chat(chat_id)
+        bulk_delete = getattr(context.bot, 'delete_messages', None)
+
+        # Deletes go through their own lane below everything else, so live moderation never waits behind a cleanup
+        if bulk_delete is not None:
+            batches = [messages_to_delete[i:i + BULK_DELETE_SIZE] for i in range(0, len(messages_to_delete), BULK_DELETE_SIZE)]
+            futures = [(len(batch), dispatch(PRIORITY_CLEANUP, chat_id, bulk_delete, chat_id, batch, wait=False)) for batch in batches]
+        else:
+            futures = [(1, dispatch(PRIORITY_CLEANUP, chat_id, context.bot.delete_message, chat_id, msg_id, wait=False)) for msg_id in messages_to_delete]
 
-        for msg_id in messages_to_delete:
+        removed = 0
+        pending = 0
+        deadline = time.monotonic() + CLEANUP_WAIT_TIMEOUT
+        for count, future in futures:
             try:
-                context.bot.delete_message(chat_id, msg_id)
+                future.result(timeout=max(deadline - time.monotonic(), 0))
+                removed += count
+            except FutureTimeoutError:
+                pending += count  # Still queued, it is deleted once the lane frees up
             except Exception as e:
-                print(f"Failed to delete message {msg_id}: {str(e)}")  # Handle errors
+                print(f"Failed to delete messages: {str(e)}")  # Handle errors
+
+        if pending:
+            msg = reply(update, f"Removed {removed} bot messages, {pending} more are still being removed.")
+        else:
+            msg = reply(update, f"Removed {removed} bot messages.")
 
-        bot_messages = [(cid, msg_id) for cid, msg_id in bot_messages if cid != chat_id]
+    if msg is not None:
+        track_message(msg)
 #endregion Admin Slash Commands
 
+#region Webhook
+webhook_config = config.get('webhook', {})
+WEBHOOK_HEALTH_INTERVAL = 300  # Seconds between getWebhookInfo checks
+WEBHOOK_MAX_FAILED_CHECKS = 2  # Consecutive failing checks before falling back to polling
+webhook_failed_checks = 0
+
+def start_webhook(updater):
+    """Receive updates through a webhook, returning its server, or None when polling should be used instead."""
+    if not webhook_config.get('enabled'):
+        return None
+
+    url = os.getenv('WEBHOOK_URL') or webhook_config.get('url')
+    if not url and webhook_config.get('register', True):
+        print("Webhook enabled without a URL, falling back to polling.")
+        return None
+
+    server = WebhookServer(
+        listen=webhook_config.get('listen', '0.0.0.0'),
+        port=int(os.getenv('PORT') or webhook_config.get('port', 8443)),
+        url_path=webhook_config.get('path', '/telegram'),
+        secret_token=os.getenv('WEBHOOK_SECRET') or secrets.token_urlsafe(32),
+        max_connections=webhook_config.get('maxConnections', 40),
+        cert=webhook_config.get('cert'),
+        key=webhook_config.get('key')
+    )
+    try:
+        server.start(updater.bot, updater.dispatcher.update_queue)
+        # Without registering, a proxy or the local fake sender delivers to the listener
+        if webhook_config.get('register', True):
+            certificate = open(server.cert, 'rb') if webhook_config.get('selfSigned') else None
+            try:
+                updater.bot.set_webhook(
+                    url=url.rstrip('/') + server.url_path,
+                    certificate=certificate,
+                    max_connections=server.max_connections,
+                    allowed_updates=Update.ALL_TYPES,
+                    api_kwargs={'secret_token': server.secret_token}
+                )
+            finally:
+                if certificate is not None:
+                    certificate.close()
+    except Exception as e:
+        print(f"Webhook setup failed, falling back to polling: {e}")
+        server.stop()
+        return None
+
+    # The updater thread is not used, so start what start_polling would have
+    updater.job_queue.start()
+    threading.Thread(target=updater.dispatcher.start, name='dispatcher', daemon=True).start()
+    updater.running = True  # Lets idle() stop the dispatcher and job queue on a signal
+    print(f"Receiving updates by webhook on port {server.port}{server.url_path}")
+    return server
+
+def fall_back_to_polling(updater, server):
+    server.stop()
+    updater.running = False
+    try:
+        updater.bot.delete_webhook()
+    except telegram.error.TelegramError as e:
+        print(f"Failed to delete webhook: {e}")
+    updater.start_polling(allowed_updates=Update.ALL_TYPES)
+    print("Fell back to polling.")
+
+def check_webhook(context: CallbackContext) -> None:
+    global webhook_failed_checks
+    updater, server = context.job.context
+    try:
+        info = context.bot.get_webhook_info()
+    except telegram.error.TelegramError as e:
+        print(f"Failed to check webhook: {e}")
+        return
+
+    # Unhealthy once Telegram reports a fresh delivery error with updates piling up, or the webhook is gone
+    recent_error = info.last_error_date is not None and time.time() - info.last_error_date < WEBHOOK_HEALTH_INTERVAL
+    if not info.url or (recent_error and info.pending_update_count > 0):
+        webhook_failed_checks += 1
+        print(f"Webhook unhealthy ({info.last_error_message or 'not set'}, {info.pending_update_count} pending), check {webhook_failed_checks}/{WEBHOOK_MAX_FAILED_CHECKS}")
+    else:
+        webhook_failed_checks = 0
+        print(f"Webhook healthy: {server.stats()}")
+
+    if webhook_failed_checks >= WEBHOOK_MAX_FAILED_CHECKS:
+        context.job.schedule_removal()
+        fall_back_to_polling(updater, server)
+#endregion Webhook
+
 def main() -> None:
+    # Connect to Firestore and the RPC concurrently while handlers are registered
+    firebase.start()
+    web3.start()
+
+    started = time.perf_counter()
+
     # Create the Updater and pass it your bot's token
     updater = Updater(TELEGRAM_TOKEN, use_context=True)
     
@@ -1594,64 +3487,101 @@ def main() -> None:
     dispatcher = updater.dispatcher
     
     #region General Slash Command Handlers
-    dispatcher.add_handler(CommandHandler("start", start))
-    dispatcher.add_handler(CommandHandler("help", help))
-    dispatcher.add_handler(CommandHandler("play", play))
-    dispatcher.add_handler(CommandHandler("endgame", end_game))
-    dispatcher.add_handler(CommandHandler("tukyo", tukyo))
-    dispatcher.add_handler(CommandHandler("tukyogames", tukyogames))
-    dispatcher.add_handler(CommandHandler("desypher", deSypher))
-    dispatcher.add_handler(CommandHandler("sypher", sypher))
-    dispatcher.add_handler(CommandHandler("whitepaper", whitepaper))
-    dispatcher.add_handler(CommandHandler("contract", ca))
-    dispatcher.add_handler(CommandHandler("ca", ca))
-    dispatcher.add_handler(CommandHandler("chart", chart))
-    dispatcher.add_handler(CommandHandler("price", price))
-    dispatcher.add_handler(CommandHandler("liquidity", liquidity))
-    dispatcher.add_handler(CommandHandler("lp", liquidity))
-    dispatcher.add_handler(CommandHandler("volume", volume))
-    dispatcher.add_handler(CommandHandler("tokenomics", sypher))
-    dispatcher.add_handler(CommandHandler("website", website))
-    dispatcher.add_handler(CommandHandler("report", report))
-    dispatcher.add_handler(CommandHandler("save", save))
+    dispatcher.add_handler(CommandHandler("start", pooled('commands', start)))
+    dispatcher.add_handler(CommandHandler("help", pooled('commands', help)))
+    dispatcher.add_handler(CommandHandler("play", pooled('games', play)))
+    dispatcher.add_handler(CommandHandler("endgame", pooled('games', end_game)))
+    dispatcher.add_handler(CommandHandler("tukyo", pooled('commands', tukyo)))
+    dispatcher.add_handler(CommandHandler("tukyogames", pooled('commands', tukyogames)))
+    dispatcher.add_handler(CommandHandler("desypher", pooled('commands', deSypher)))
+    dispatcher.add_handler(CommandHandler("sypher", pooled('commands', sypher)))
+    dispatcher.add_handler(CommandHandler("whitepaper", pooled('commands', whitepaper)))
+    dispatcher.add_handler(CommandHandler("contract", pooled('commands', ca)))
+    dispatcher.add_handler(CommandHandler("ca", pooled('commands', ca)))
+    dispatcher.add_handler(CommandHandler("chart", pooled('heavy', chart)))
+    dispatcher.add_handler(CommandHandler("price", pooled('heavy', price)))
+    dispatcher.add_handler(CommandHandler("liquidity", pooled('heavy', liquidity)))
+    dispatcher.add_handler(CommandHandler("lp", pooled('heavy', liquidity)))
+    dispatcher.add_handler(CommandHandler("volume", pooled('heavy', volume)))
+    dispatcher.add_handler(CommandHandler("stats", pooled('heavy', stats)))
+    dispatcher.add_handler(CommandHandler("tokenomics", pooled('commands', sypher)))
+    dispatcher.add_handler(CommandHandler("website", pooled('commands', website)))
+    dispatcher.add_handler(CommandHandler("report", pooled('commands', report)))
+    dispatcher.add_handler(CommandHandler("save", pooled('commands', save)))
     #endregion General Slash Command Handlers
 
     #region Admin Slash Command Handlers
-    dispatcher.add_handler(CommandHandler("adminhelp", admin_help))
-    dispatcher.add_handler(CommandHandler('cleanbot', cleanbot))
-    dispatcher.add_handler(CommandHandler('cleargames', cleargames))
-    dispatcher.add_handler(CommandHandler('antiraid', antiraid))
-    dispatcher.add_handler(CommandHandler("mute", mute))
-    dispatcher.add_handler(CommandHandler("unmute", unmute))
-    dispatcher.add_handler(CommandHandler("kick", kick))
-    dispatcher.add_handler(CommandHandler("filter", filter))
-    dispatcher.add_handler(CommandHandler("removefilter", remove_filter))
-    dispatcher.add_handler(CommandHandler("filterlist", filter_list))
-    dispatcher.add_handler(CommandHandler("warn", warn))
+    dispatcher.add_handler(CommandHandler("adminhelp", pooled('commands', admin_help)))
+    dispatcher.add_handler(CommandHandler('cleanbot', pooled('commands', cleanbot)))
+    dispatcher.add_handler(CommandHandler('cleargames', pooled('games', cleargames)))
+    dispatcher.add_handler(CommandHandler('status', pooled('commands', status)))
+    dispatcher.add_handler(CommandHandler('antiraid', pooled('commands', antiraid)))
+    dispatcher.add_handler(CommandHandler("mute", pooled('moderation', mute)))
+    dispatcher.add_handler(CommandHandler("unmute", pooled('moderation', unmute)))
+    dispatcher.add_handler(CommandHandler("kick", pooled('moderation', kick)))
+    dispatcher.add_handler(CommandHandler("filter", pooled('commands', filter)))
+    dispatcher.add_handler(CommandHandler("removefilter", pooled('commands', remove_filter)))
+    dispatcher.add_handler(CommandHandler("filterlist", pooled('commands', filter_list)))
+    dispatcher.add_handler(CommandHandler("warn", pooled('moderation', warn)))
     #endregion Admin Slash Command Handlers
     
     # Register the message handler for new users
-    dispatcher.add_handler(MessageHandler(Filters.status_update.new_chat_members, handle_new_user))
+    dispatcher.add_handler(MessageHandler(Filters.status_update.new_chat_members, pooled('moderation', handle_new_user)))
 
     # Add a handler for deleting service messages
-    dispatcher.add_handler(MessageHandler(Filters.status_update.left_chat_member, delete_service_messages))
+    dispatcher.add_handler(MessageHandler(Filters.status_update.left_chat_member, pooled('moderation', delete_service_messages)))
     
     # Register the message handler for anti-spam
-    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_message))
+    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, pooled('moderation', handle_message)))
+
+    # Game guesses see the same messages from their own group, on the games workers
+    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, pooled('games', handle_guess)), group=1)
 
     # Register the callback query handler for button clicks
-    dispatcher.add_handler(CallbackQueryHandler(verification_callback, pattern='^verify_\d+$'))
-    dispatcher.add_handler(CallbackQueryHandler(handle_start_verification, pattern='start_verification'))
-    dispatcher.add_handler(CallbackQueryHandler(handle_verification_button, pattern=r'verify_letter_[A-Z]'))
-    dispatcher.add_handler(CallbackQueryHandler(handle_start_game, pattern='^startGame$'))
-    dispatcher.add_handler(CallbackQueryHandler(help_buttons, pattern='^help_'))
+    dispatcher.add_handler(CallbackQueryHandler(pooled('moderation', verification_callback), pattern='^verify_\d+$'))
+    dispatcher.add_handler(CallbackQueryHandler(pooled('moderation', handle_start_verification), pattern='start_verification'))
+    dispatcher.add_handler(CallbackQueryHandler(pooled('moderation', handle_verification_button), pattern=r'verify_letter_[A-Z]'))
+    dispatcher.add_handler(CallbackQueryHandler(pooled('games', handle_start_game), pattern='^startGame$'))
+    dispatcher.add_handler(CallbackQueryHandler(pooled('commands', help_buttons), pattern='^help_'))
+
+    # Keep the cached admin lists current when members are promoted or demoted
+    dispatcher.add_handler(ChatMemberHandler(handle_chat_member_update, ChatMemberHandler.ANY_CHAT_MEMBER))
+
+    startup_timings['handlers'] = time.perf_counter() - started
+
+    # Start the shared outbound sender before any handler can queue a message
+    outbound.start(updater.bot)
+
+    # Keep the local candle store current for /chart
+    updater.job_queue.run_repeating(sync_candle_store, interval=60, first=1)
+
+    # Forget idle users and expired messages so the trackers stay bounded
+    updater.job_queue.run_repeating(prune_trackers, interval=300, first=300)
+
+    # Load the filter list and keep it in sync with Firestore once it is up
+    threading.Thread(target=watch_filters, daemon=True).start()
 
     monitor_thread = threading.Thread(target=monitor_transfers)
     monitor_thread.start()
     
-    # Start the Bot
-    updater.start_polling()
+    # Start the Bot, by webhook when configured and reachable, otherwise by polling
+    started = time.perf_counter()
+    webhook_server = start_webhook(updater)
+    if webhook_server is not None:
+        startup_timings['webhook'] = time.perf_counter() - started
+        if webhook_config.get('register', True):
+            updater.job_queue.run_repeating(check_webhook, interval=WEBHOOK_HEALTH_INTERVAL, context=(updater, webhook_server))
+    else:
+        updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        startup_timings['polling'] = time.perf_counter() - started
+    print(f"Receiving updates after {time.perf_counter() - STARTUP_STARTED:.2f}s: {startup_report()}")
+
+    # Warm the chart workers once polling has started, so their imports stay off the startup path
+    updater.job_queue.run_once(lambda context: chart_renderer.start(), when=5)
+
     updater.idle()
+    if webhook_server is not None:
+        webhook_server.stop()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
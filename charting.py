@@ -0,0 +1,108 @@
+import io
+import numpy as np
+import pandas as pd
+import mplfinance as mpf
+
+#
+## Chart rendering for the deSypher bot.
+## Runs inside the chart process pool, so it imports nothing from bot.py.
+#
+
+style = None
+
+def init_worker():
+    # Build the style once per worker so each render only has to plot
+    global style
+    mc = mpf.make_marketcolors(
+        up='#2dc60e',
+        down='#ff0000',
+        edge='inherit',
+        wick='inherit',
+        volume='inherit'
+    )
+    style = mpf.make_mpf_style(
+        marketcolors=mc,
+        rc={
+            'font.size': 8,
+            'axes.labelcolor': '#2dc60e',
+            'axes.edgecolor': '#2dc60e',
+            'xtick.color': '#2dc60e',
+            'ytick.color': '#2dc60e',
+            'grid.color': '#0f3e07',
+            'grid.linestyle': '--',
+            'figure.facecolor': 'black',
+            'axes.facecolor': 'black'
+        }
+    )
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def ohlcv_to_frame(ohlcv_list):
+    # One conversion for the whole list, then columns are views into the array
+    values = np.asarray(ohlcv_list, dtype=np.float64).reshape(-1, 6)
+    values = values[np.argsort(values[:, 0], kind='stable')]
+    index = pd.DatetimeIndex(pd.to_datetime(values[:, 0].astype(np.int64), unit='s'), name='Date')
+    return pd.DataFrame(values[:, 1:6], index=index, columns=OHLCV_COLUMNS)
+
+def sma(close, period):
+    return close.rolling(period, min_periods=period).mean()
+
+def ema(close, period):
+    return close.ewm(span=period, adjust=False).mean()
+
+def vwap(data_frame):
+    typical_price = (data_frame['High'].to_numpy() + data_frame['Low'].to_numpy() + data_frame['Close'].to_numpy()) / 3
+    volume = data_frame['Volume'].to_numpy()
+    cumulative_volume = np.cumsum(volume)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.Series(np.cumsum(typical_price * volume) / cumulative_volume, index=data_frame.index)
+
+def vwap_bands(data_frame, width=2):
+    # Volume-weighted standard deviation around the running VWAP
+    typical_price = (data_frame['High'].to_numpy() + data_frame['Low'].to_numpy() + data_frame['Close'].to_numpy()) / 3
+    volume = data_frame['Volume'].to_numpy()
+    cumulative_volume = np.cumsum(volume)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.cumsum(typical_price * volume) / cumulative_volume
+        variance = np.cumsum(typical_price * typical_price * volume) / cumulative_volume - mean * mean
+    deviation = np.sqrt(np.clip(variance, 0, None))
+    return (
+        pd.Series(mean + width * deviation, index=data_frame.index),
+        pd.Series(mean - width * deviation, index=data_frame.index),
+    )
+
+OVERLAY_COLORS = ['#f5d90a', '#0ab8f5', '#f50ab8', '#ffffff', '#ff8c00']
+
+def build_overlays(data_frame, overlays):
+    """Turn overlay names like 'sma20', 'ema50', 'vwap' and 'bands' into mplfinance addplots."""
+    series = []
+    close = data_frame['Close']
+    for name in overlays:
+        if name.startswith('sma'):
+            series.append(sma(close, int(name[3:])))
+        elif name.startswith('ema'):
+            series.append(ema(close, int(name[3:])))
+        elif name == 'vwap':
+            series.append(vwap(data_frame))
+        elif name == 'bands':
+            series.extend(vwap_bands(data_frame))
+
+    addplots = []
+    for index, line in enumerate(series):
+        if line.notna().any():
+            addplots.append(mpf.make_addplot(line, color=OVERLAY_COLORS[index % len(OVERLAY_COLORS)], width=0.8))
+    return addplots
+
+def warm_up():
+    return style is not None
+
+def render_chart(data_frame, overlays=()):
+    if style is None:
+        init_worker()
+
+    addplots = build_overlays(data_frame, overlays)
+    buffer = io.BytesIO()
+    # mplfinance rejects addplot=None, so the keyword is only passed with overlays
+    extra = {'addplot': addplots} if addplots else {}
+    mpf.plot(data_frame, type='candle', style=style, volume=True, savefig=dict(fname=buffer, format='png'), **extra)
+    return buffer.getvalue()
@@ -0,0 +1,57 @@
+import sys
+import json
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+#
+## Local stand-in for Telegram's webhook delivery, for testing webhook mode without a public URL.
+## Run the bot with webhook.enabled true and webhook.register false, and WEBHOOK_SECRET set, then:
+## Usage: python fake_telegram.py [url] [secret] [updates] [connections] [chat_id]
+#
+
+def make_update(update_id, chat_id):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'supergroup', 'title': 'Fake Telegram'},
+            'from': {'id': 1000 + update_id % 50, 'is_bot': False, 'first_name': f'Tester{update_id % 50}'},
+            'text': f'fake message {update_id}'
+        }
+    }
+
+def deliver(session, url, secret, body):
+    start = time.perf_counter()
+    response = session.post(url, data=body, headers={
+        'Content-Type': 'application/json',
+        'X-Telegram-Bot-Api-Secret-Token': secret
+    }, timeout=10)
+    return response.status_code, time.perf_counter() - start
+
+def main(url='http://127.0.0.1:8443/telegram', secret='', updates=200, connections=40, chat_id=-100):
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=connections))
+    session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=connections))
+
+    status, _ = deliver(session, url, secret + 'wrong', json.dumps(make_update(0, chat_id)))
+    print(f"Wrong secret: HTTP {status} ({'ok' if status == 403 else 'expected 403'})")
+
+    bodies = [json.dumps(make_update(update_id, chat_id)) for update_id in range(1, updates + 1)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        results = list(pool.map(lambda body: deliver(session, url, secret, body), bodies))
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = sorted(latency for _, latency in results)
+    print(f"Delivered {updates} updates over {connections} connections in {elapsed:.2f}s ({updates / elapsed:.0f}/s)")
+    print(f"Statuses: {statuses}")
+    print(f"Handoff latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(*args[:2], *(int(arg) for arg in args[2:5]))